@@ -0,0 +1,113 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .Drone import Drone
+from .Instrumentation import ApiProxy
+
+class LockedApi(ApiProxy):
+    """Proxy of a pyhula.UserApi letting only one thread talk to the drone at a time"""
+    def __init__(self, api):
+        super().__init__(api)
+        self._lock = threading.Lock()
+
+    def wrap(self, name, method):
+        lock = self._lock
+
+        def locked(*args, **kwargs):
+            with lock:
+                return method(*args, **kwargs)
+        return locked
+
+class AsyncDrone:
+    """
+    asyncio facade over Drone. Flight commands run one at a time on a
+    dedicated command thread and CPU work such as planning on the event
+    loop's default executor, so they overlap: a route can be planned while
+    the drone connects and takes off. While wrapped, the drone's API is a
+    LockedApi, so calls made from work handed to run() never interleave with
+    flight commands on the radio link, while the settle sleeps between them
+    do not hold the lock. close() gives the Drone its own API back.
+
+    Build one with await AsyncDrone.create(...), which connects off the event
+    loop, or wrap an existing Drone.
+    """
+    def __init__(self, drone):
+        self.drone = drone
+        self.api = drone.api
+        if not isinstance(drone.api, LockedApi):
+            drone.api = LockedApi(drone.api)
+
+        self.commands = ThreadPoolExecutor(max_workers=1, thread_name_prefix="drone-commands")
+
+    @classmethod
+    async def create(cls, *args, **kwargs):
+        """Construct and connect a Drone(*args, **kwargs) without blocking the event loop"""
+        return await cls.connect(functools.partial(Drone, *args, **kwargs))
+
+    @classmethod
+    async def connect(cls, connect):
+        """Wrap the Drone returned by connect(), e.g. DroneSession.acquire, run without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        drone = await loop.run_in_executor(None, connect)
+        return cls(drone)
+
+    async def _command(self, function, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.commands, functools.partial(function, *args, **kwargs))
+
+    async def run(self, function, *args, **kwargs):
+        """Run blocking CPU or I/O work, e.g. planning, alongside flight commands"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(function, *args, **kwargs))
+
+    async def take_off(self):
+        await self._command(self.drone.take_off)
+
+    async def land(self):
+        await self._command(self.drone.land)
+
+    async def close(self):
+        """Release the command thread and restore the Drone's own API; the Drone stays usable"""
+        self.commands.shutdown(wait=True)
+        self.drone.api = self.api
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+        return False
+
+async def take_off_while_planning(plan, connect):
+    """
+    Run plan() on a worker thread while the Drone returned by connect()
+    connects, configures itself and takes off, instead of planning on the
+    ground first. connect is e.g. functools.partial(Drone, bearing) or
+    functools.partial(session.acquire, bearing, challenge, phase).
+
+    The drone is airborne by the time the plan is known, so when plan()
+    returns None or raises, it lands again before None is returned or the
+    error re-raised.
+
+    Returns:
+        tuple: (drone, plan_result) once the drone is airborne and the plan is
+        ready, or landed again when plan_result is None
+    """
+    loop = asyncio.get_running_loop()
+    planning = loop.run_in_executor(None, plan)
+    try:
+        async with await AsyncDrone.connect(connect) as drone:
+            await drone.take_off()
+            try:
+                plan_result = await planning
+            except BaseException:
+                await drone.land()
+                raise
+            if plan_result is None:
+                await drone.land()
+    except BaseException:
+        # Connecting or taking off failed; let the planner finish before giving up
+        await asyncio.wait([planning])
+        raise
+    return drone.drone, plan_result
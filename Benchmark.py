@@ -0,0 +1,302 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from PyhulaPlayground import Maze, PathFinder, Utils
+
+MAZE_KINDS = ("perfect", "rooms", "open")
+DEFAULT_SIZES = (5, 25, 100, 300, 1000)
+GOAL_COUNTS = (3, 6, 9, 12)
+
+# Largest mazes the slower benchmarks run on
+MULTI_GOAL_MAX_SIZE = 100
+DISCOVERY_MAX_SIZE = 25
+
+DEFAULT_OUTPUT = "benchmark_results.json"
+
+def generate_maze(kind, size, seed=0):
+    """
+    Deterministic size x size benchmark maze.
+
+    kind:
+        "perfect": recursive-backtracker maze, exactly one route between any two cells
+        "rooms": 5x5 rooms joined by one door per shared side, with a few random walls inside
+        "open": open field with sparse random wall segments
+    """
+    rng = random.Random(f"{kind}-{size}-{seed}")
+    maze = Maze.Maze(size, size)
+
+    if kind == "perfect":
+        opened = set()
+        seen = {(0, 0)}
+        stack = [(0, 0)]
+        while stack:
+            cell = stack[-1]
+            neighbors = [(cell[0] + dx, cell[1] + dy) for dx, dy, _ in Maze.DIRECTIONS
+                         if maze.in_bounds((cell[0] + dx, cell[1] + dy)) and (cell[0] + dx, cell[1] + dy) not in seen]
+            if not neighbors:
+                stack.pop()
+                continue
+            neighbor = rng.choice(neighbors)
+            seen.add(neighbor)
+            opened.add((cell, neighbor))
+            opened.add((neighbor, cell))
+            stack.append(neighbor)
+        for y in range(size):
+            for x in range(size):
+                for neighbor in ((x + 1, y), (x, y + 1)):
+                    if maze.in_bounds(neighbor) and ((x, y), neighbor) not in opened:
+                        maze.add_wall((x, y), neighbor)
+
+    elif kind == "rooms":
+        room = 5
+        for boundary in range(room - 1, size - 1, room):
+            for offset in range(0, size, room):
+                door = offset + rng.randrange(room)
+                for along in range(offset, min(offset + room, size)):
+                    if along != door:
+                        maze.add_wall((boundary, along), (boundary + 1, along))
+                door = offset + rng.randrange(room)
+                for along in range(offset, min(offset + room, size)):
+                    if along != door:
+                        maze.add_wall((along, boundary), (along, boundary + 1))
+        for _ in range(size * size // 20):
+            _add_random_wall(maze, rng)
+        _connect(maze)
+
+    elif kind == "open":
+        for _ in range(size * size // 10):
+            _add_random_wall(maze, rng)
+        _connect(maze)
+
+    else:
+        raise ValueError(f"Unknown maze kind: {kind}")
+
+    return maze
+
+def _add_random_wall(maze, rng):
+    """Wall off one random side between two cells; the outer edge is implied by the bounds and never stored"""
+    cell = (rng.randrange(maze.width), rng.randrange(maze.height))
+    dx, dy, _ = rng.choice(Maze.DIRECTIONS)
+    neighbor = (cell[0] + dx, cell[1] + dy)
+    if maze.in_bounds(neighbor):
+        maze.add_wall(cell, neighbor)
+
+def _connect(maze):
+    """Knock down walls until every cell is reachable from (0, 0)"""
+    while True:
+        field = PathFinder.DistanceField(maze, (0, 0))
+        unreachable = [index for index, distance in enumerate(field.distances) if distance == PathFinder.UNREACHABLE]
+        if not unreachable:
+            return
+
+        reached = False
+        for index in unreachable:
+            cell = (index % maze.width, index // maze.width)
+            for dx, dy, bit in Maze.DIRECTIONS:
+                neighbor = (cell[0] + dx, cell[1] + dy)
+                if maze.in_bounds(neighbor) and field.distance(neighbor) is not None:
+                    _remove_wall(maze, cell, neighbor, bit)
+                    reached = True
+                    break
+        if not reached:
+            # Isolated pockets only; open the first unreachable cell towards the origin
+            cell = (unreachable[0] % maze.width, unreachable[0] // maze.width)
+            dx, dy, bit = Maze.DIRECTIONS[3] if cell[0] > 0 else Maze.DIRECTIONS[2]
+            _remove_wall(maze, cell, (cell[0] + dx, cell[1] + dy), bit)
+
+def _remove_wall(maze, cell, neighbor, bit):
+    index = cell[1] * maze.width + cell[0]
+    if not maze.cells[index] & bit:
+        return
+    maze.cells[index] &= ~bit
+    maze.cells[neighbor[1] * maze.width + neighbor[0]] &= ~Maze.OPPOSITE_BITS[bit]
+    maze.wall_count -= 1
+
+def measure(operation, repeat=3):
+    """
+    Run operation() repeat times and once more under tracemalloc.
+
+    Returns:
+        dict with the best wall-clock seconds, the grid A* node expansions and
+        the peak traced memory in bytes of one run, and the operation's result
+    """
+    best = None
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            PathFinder.reset_expansions()
+            started = time.perf_counter()
+            result = operation()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        expansions = PathFinder.expansions
+
+        tracemalloc.start()
+        try:
+            operation()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return {'seconds': best, 'expansions': expansions, 'peak_bytes': peak, 'result': result}
+
+def benchmark_maze(kind, size, seed, repeat):
+    """Every benchmark that applies to one generated maze, as a list of result records"""
+    records = []
+    maze = generate_maze(kind, size, seed)
+    rng = random.Random(seed)
+    start = (0, 0)
+    goal = (size - 1, size - 1)
+
+    def record(operation, measured, **extra):
+        entry = {'maze': kind, 'size': size, 'seed': seed, 'operation': operation,
+                 'seconds': measured['seconds'], 'expansions': measured['expansions'],
+                 'peak_bytes': measured['peak_bytes']}
+        entry.update(extra)
+        records.append(entry)
+        print(f"{kind:>8} {size:>5} {operation:<44} {measured['seconds'] * 1000:10.2f} ms "
+              f"{measured['expansions']:>9} exp {measured['peak_bytes'] / 1024:10.1f} KiB")
+
+    path = None
+    for label, cost_model in (("astar_straight_preference", None),
+                              ("astar_straight_preference[turns]", PathFinder.TurnCountCost()),
+                              ("astar_straight_preference[time]", PathFinder.FlightTimeCost())):
+        measured = measure(lambda: PathFinder.astar_straight_preference(maze, start, goal, cost_model=cost_model), repeat)
+        path = measured['result']
+        record(label, measured, path_length=None if path is None else len(path) - 1)
+
+    if path is not None:
+        measured = measure(lambda: Utils.optimized_path(path), repeat)
+        record("optimized_path", measured, legs=len(measured['result']) - 1)
+
+    if size <= MULTI_GOAL_MAX_SIZE:
+        cells = [(x, y) for y in range(size) for x in range(size) if (x, y) != start]
+        for goal_count in GOAL_COUNTS:
+            if goal_count > len(cells):
+                continue
+            goals = rng.sample(cells, goal_count)
+            measured = measure(lambda: PathFinder.astar_multi_goal_straight_preference(maze, start, goals), repeat)
+            record(f"astar_multi_goal_straight_preference[{goal_count}]", measured, goals=goal_count)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for binary in (False, True):
+            filename = os.path.join(directory, "maze" + Utils.BINARY_MAZE_EXTENSION if binary else "maze.txt")
+            suffix = "binary" if binary else "json"
+            measured = measure(lambda: Utils.save_maze_to_file(maze, filename, binary), repeat)
+            record(f"save_maze_to_file[{suffix}]", measured, file_bytes=os.path.getsize(filename))
+            record(f"load_maze_from_file[{suffix}]", measure(lambda: Utils.load_maze_from_file(filename), repeat))
+
+    if size <= DISCOVERY_MAX_SIZE:
+        for strategy in ("dfs", "frontier"):
+            records.append(benchmark_discovery(maze, strategy))
+            entry = records[-1]
+            entry.update({'maze': kind, 'size': size, 'seed': seed})
+            print(f"{kind:>8} {size:>5} {entry['operation']:<44} {entry['seconds'] * 1000:10.2f} ms "
+                  f"{entry['moves']:>5} moves {entry['flight_seconds']:8.1f} s flight")
+
+    return records
+
+def benchmark_discovery(truth, strategy):
+    """discover_maze() of truth against the simulator, with simulated flight time and move counts"""
+    from PyhulaPlayground.Drone import Drone
+    from PyhulaPlayground.Simulator import SimulatedUserApi
+
+    api = SimulatedUserApi(truth, seed=0)
+    maze = Maze.Maze(truth.width, truth.height)
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        drone = Drone(api=api, sleep=api.sleep, clock=api.clock)
+        drone.take_off()
+        takeoff_seconds = api.elapsed
+        started = time.perf_counter()
+        _, cells_explored = PathFinder.discover_maze(maze, (0, 0), drone, strategy=strategy)
+        elapsed = time.perf_counter() - started
+
+    return {'operation': f"discover_maze[{strategy}]", 'seconds': elapsed,
+            'flight_seconds': api.elapsed - takeoff_seconds, 'moves': api.moves, 'scans': api.scans,
+            'collisions': api.collisions, 'cells_explored': cells_explored,
+            'complete': bytes(maze.cells) == bytes(truth.cells)}
+
+def measure_turn_time(api, repeat=4, clock=time.perf_counter):
+    """
+    Average seconds one blocking 90 degree turn call takes, alternating right
+    and left turns so the drone ends up facing the way it started. Set
+    Utils.TURN_TIME_PER_QUARTER from this, measured on the drone.
+    """
+    total = 0.0
+    for i in range(2 * repeat):
+        turn = api.single_fly_turnright if i % 2 == 0 else api.single_fly_turnleft
+        started = clock()
+        turn(90)
+        total += clock() - started
+    return total / (2 * repeat)
+
+def measure_drone_turns(repeat=4):
+    """Take off with the connected drone, time its quarter turns and land"""
+    from PyhulaPlayground.Drone import Drone
+
+    drone = Drone()
+    drone.take_off()
+    try:
+        seconds = measure_turn_time(drone.api, repeat)
+    finally:
+        drone.land()
+    print(f"Quarter turn: {seconds:.2f} s (Utils.TURN_TIME_PER_QUARTER = {Utils.TURN_TIME_PER_QUARTER})")
+    return seconds
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def run(kinds=MAZE_KINDS, sizes=DEFAULT_SIZES, seed=0, repeat=3, output=DEFAULT_OUTPUT):
+    """Benchmark every maze kind and size and write the results to output as JSON"""
+    logs_enabled = PathFinder.LOGS_ENABLED
+    PathFinder.LOGS_ENABLED = False
+    records = []
+    try:
+        for kind in kinds:
+            for size in sizes:
+                records.extend(benchmark_maze(kind, size, seed, repeat))
+    finally:
+        PathFinder.LOGS_ENABLED = logs_enabled
+
+    results = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        'seed': seed,
+        'repeat': repeat,
+        'results': records
+    }
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nBenchmark results written to {output}")
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the maze planners on generated mazes")
+    parser.add_argument("--kinds", nargs="+", choices=MAZE_KINDS, default=list(MAZE_KINDS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(DEFAULT_SIZES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark, the best is kept")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--measure-turns", action="store_true",
+                        help="time the connected drone's quarter turns instead of benchmarking the planners")
+    args = parser.parse_args(argv)
+    if args.measure_turns:
+        measure_drone_turns(args.repeat)
+        return
+    run(args.kinds, args.sizes, args.seed, args.repeat, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,27 @@
+import asyncio
+import functools
 import tkinter as tk
 from PyhulaPlayground import Maze, PathFinder, Utils
 from PyhulaPlayground.Challenge1Gui import Gui
-from PyhulaPlayground.Drone import Drone
+from PyhulaPlayground.DroneSession import DroneSession
+from PyhulaPlayground.AsyncDrone import take_off_while_planning
+from PyhulaPlayground.DiscoveryLog import DiscoveryLog
+from PyhulaPlayground import Instrumentation
 
-file_name = "maze_challenge_1.txt"
+file_name = "maze_challenge_1.maze"
+# JSON maze used until a discovery writes file_name
+json_file_name = "maze_challenge_1.txt"
+discovery_log_file_name = "maze_challenge_1.discovery.log"
 
 class Challenge1Controller:
-    def __init__(self):
+    def __init__(self, api=None, sleep=None, vision=None, clock=None):
+        # Drone backend, e.g. a Simulator.SimulatedUserApi, its sleep() and clock() and Simulator.create_vision;
+        # real hardware when None
+        self.api = api
+        self.sleep = sleep
+        # One connection reused by every discovery and race
+        self.session = DroneSession(None if api is None else lambda: api, sleep, vision, clock)
+        self.recorder = None
         self.gui = None
         self.maze = None
         self.drone = None
@@ -21,30 +36,47 @@ class Challenge1Controller:
         height = params['height']
         start = params['start']
         bearing = params['bearing']
+        # Goal to stop discovery at once the fastest route to it is proven; explore the whole maze when None
+        goal = params.get('goal')
+        # Continue an interrupted discovery of the same arena instead of starting over
+        resume = params.get('resume', False)
 
-        self.gui.write_output("=== Challenge 1 Maze Discovery Started ===\n")
-        self.gui.write_output(f"Start: {start}, Bearing: {bearing}\n")
+        self.on_progress("=== Challenge 1 Maze Discovery Started ===\n")
+        self.on_progress(f"Start: {start}, Bearing: {bearing}\n")
 
         self.maze = Maze.Maze(width, height)
+        self.recorder = Instrumentation.new_recorder()
+        if resume:
+            self.report_resumable_cells(start)
 
-        self.drone = Drone(bearing)
+        self.drone = self.session.acquire(bearing, recorder=self.recorder)
 
         self.on_progress("Taking off...\n")
         self.drone.take_off()
 
         self.on_progress("Starting maze discovery...\n")
-        PathFinder.discover_maze(self.maze, start, self.drone)
+        PathFinder.discover_maze(self.maze, start, self.drone, strategy="frontier", log_file=discovery_log_file_name,
+                                 targets=None if goal is None else [goal], resume=resume)
 
         self.on_progress("Saving maze to file...\n")
-        Utils.save_maze_to_file(self.maze, file_name)
+        Utils.save_maze_to_file(self.maze, file_name, binary=True)
+        DiscoveryLog(discovery_log_file_name).delete()
 
         self.on_progress("Landing...\n")
         self.drone.land()
 
         self.on_progress("Discovery complete!\n")
+        self.export_timeline("discovery")
 
         return
 
+    def report_resumable_cells(self, start):
+        cells = DiscoveryLog(discovery_log_file_name).count_resumable_cells(self.maze, start, "frontier")
+        if cells:
+            self.on_progress(f"Resuming interrupted discovery: {cells} cells already explored\n")
+        else:
+            self.on_progress("No interrupted discovery to resume, starting over\n")
+
     def on_start_race(self, params):
         start = params['start']
         bearing = params['bearing']
@@ -57,30 +89,55 @@ class Challenge1Controller:
         self.on_progress(f"Risky run value: {is_risky}\n\n")
 
         self.on_progress("loading maze...\n")
-        maze = Utils.load_maze_from_file(file_name)
+        maze = Utils.load_maze_from_files([file_name, json_file_name])
         maze_file_not_found = (maze is None)
         if maze_file_not_found:
-            self.gui.write_output("\n***WARNING***: Maze file not found.\n")
+            self.on_progress("\n***WARNING***: Maze file not found.\n")
             return
 
+        self.recorder = Instrumentation.new_recorder()
         challenge_number = 1
         phase_number = 2
-        self.drone = Drone(bearing, challenge_number, phase_number, is_risky)
-
-        self.on_progress("Calculating optimal path...\n")
-        path = PathFinder.astar_straight_preference(maze, start, goal)
-        optimized_path = Utils.optimized_path(path)
 
+        # Plan while the drone connects and takes off
         self.on_progress("Taking off...\n")
-        self.drone.take_off()
+        self.drone, path = asyncio.run(take_off_while_planning(
+            lambda: self.plan_race(maze, start, goal),
+            functools.partial(self.session.acquire, bearing, challenge_number, phase_number, is_risky,
+                              recorder=self.recorder)))
+        if path is None:
+            self.on_progress("\n***WARNING***: No path to the goal, landed.\n")
+            return
+        optimized_path = Utils.optimized_path(path)
 
         self.on_progress(f"Traversing optimal path\n")
-        self.drone.traverse_path(optimized_path)
+        if not PathFinder.fly_race_path(maze, optimized_path, self.drone):
+            self.on_progress("\n***WARNING***: Walls missing from the maze file cut off the goal.\n")
 
         self.on_progress("Landing...\n")
         self.drone.land()
 
         self.on_progress("\n=== Race Complete ===\n")
+        self.export_timeline("race")
+
+    def plan_race(self, maze, start, goal):
+        plan_query = {'planner': 'astar_straight_preference', 'cost_model': 'FlightTimeCost', 'start': start, 'goal': goal}
+        path = Utils.load_cached_plan(file_name, maze, plan_query)
+        if path is None:
+            self.on_progress("Calculating optimal path...\n")
+            with Instrumentation.span(self.recorder, "planner", "astar_straight_preference"):
+                distances = PathFinder.distance_field(maze, goal)
+                path = PathFinder.astar_straight_preference(maze, start, goal, cost_model=PathFinder.FlightTimeCost(),
+                                                            distances=distances)
+            if path is not None:
+                Utils.save_cached_plan(file_name, maze, plan_query, path)
+        else:
+            self.on_progress("Using cached path...\n")
+        return path
+
+    def export_timeline(self, phase):
+        if self.recorder is not None:
+            self.recorder.export(f"challenge_1_{phase}")
 
     def on_progress(self, message):
         if self.gui:
@@ -48,6 +48,16 @@ class Gui:
         self.goal_location_entry.grid(row=3, column=1, sticky=(tk.W, tk.E), pady=5)
         self.goal_location_entry.insert(0, "0,4")  # Default value
 
+        # Goal-directed discovery checkbox
+        self.stop_at_goal_value = tk.BooleanVar(value=False)
+        self.stop_at_goal_checkbox = ttk.Checkbutton(main_frame, text="Stop discovery at goal?", variable=self.stop_at_goal_value)
+        self.stop_at_goal_checkbox.grid(row=4, column=1, sticky=tk.W, pady=5)
+
+        # Resume discovery checkbox
+        self.resume_value = tk.BooleanVar(value=False)
+        self.resume_checkbox = ttk.Checkbutton(main_frame, text="Resume interrupted discovery?", variable=self.resume_value)
+        self.resume_checkbox.grid(row=4, column=2, sticky=tk.W, pady=5)
+
         # Start Discovery Button
         self.start_discovery_button = ttk.Button(main_frame, text="Start Discovery", command=self._on_start_discovery_clicked)
         self.start_discovery_button.grid(row=5, column=0, columnspan=1, pady=15)
@@ -86,19 +96,32 @@ class Gui:
 
             is_risky = self.risk_value.get()
 
+            stop_at_goal = self.stop_at_goal_value.get()
+            goal = None
+            if stop_at_goal:
+                goal_location = self.goal_location_entry.get()
+                x, y = map(int, goal_location.split(','))
+                goal = (x, y)
+
+            resume = self.resume_value.get()
+
             params = {
                 'width': width,
                 'height': height,
                 'start': start,
                 'bearing': bearing,
-                'is_risky': is_risky
+                'is_risky': is_risky,
+                'goal': goal,
+                'resume': resume
             }
 
             message = (
                 f"Maze Size: {width}x{height}\n"
                 f"Start Position: {start}\n"
                 f"Drone Initial Bearing: {bearing}\n"
-                f"Risky run value: {is_risky}\n\n"
+                f"Risky run value: {is_risky}\n"
+                f"Stop at goal: {goal if stop_at_goal else 'No'}\n"
+                f"Resume interrupted discovery: {'Yes, trusting the walls it found' if resume else 'No'}\n\n"
                 f"This will delete existing maze text file.\n"
                 f"Make sure it is safe and you're clear for takeoff.\n\n"
                 f"Start discovery?"
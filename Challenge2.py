@@ -3,8 +3,8 @@ from PyhulaPlayground import Maze, PathFinder, Utils
 # start = (0, 0)
 # current_bearing = "North"
 
-# fileName = "maze_challenge_2.txt"
-# maze = Utils.load_maze_from_file(fileName)
+# fileName = "maze_challenge_2.maze"
+# maze = Utils.load_maze_from_files([fileName, "maze_challenge_2.txt"])
 # is_discovery_phase = (maze is None)
 #
 # drone = Drone(current_bearing)
@@ -12,8 +12,8 @@ from PyhulaPlayground import Maze, PathFinder, Utils
 if is_discovery_phase:
     maze = Maze.Maze(100, 100)
     drone.take_off()
-    PathFinder.discover_maze(maze, start, drone)
-    Utils.save_maze_to_file(maze, fileName)
+    PathFinder.discover_maze(maze, start, drone, strategy="frontier", shrink_to_fit=True)
+    Utils.save_maze_to_file(maze, fileName, binary=True)
     drone.land()
 else:
     # objects = {
@@ -22,7 +22,7 @@ else:
     #     (2, 0): ["West"]
     # }
     object_coordinates = objects.keys()
-    paths = PathFinder.astar_multi_goal_straight_preference(maze, start, object_coordinates)
+    paths = PathFinder.astar_multi_goal_straight_preference(maze, start, object_coordinates, cost_model=PathFinder.FlightTimeCost())
     optimized_paths = []
     for i in range(len(paths)):
         optimized_path = Utils.optimize_path(paths[i])
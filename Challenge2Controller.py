@@ -1,14 +1,33 @@
+import asyncio
+import functools
 import tkinter as tk
-from PyhulaPlayground import Maze, PathFinder, Utils
+from PyhulaPlayground import Maze, PathFinder, Utils, JunctionGraph
 from PyhulaPlayground.Challenge2Gui import Gui
 import PyhulaPlayground.Challenge2Gui as Challenge2Gui
-from PyhulaPlayground.Drone import Drone
+from PyhulaPlayground.Drone import warm_up_vision
+from PyhulaPlayground.DroneSession import DroneSession
+from PyhulaPlayground.AsyncDrone import take_off_while_planning
+from PyhulaPlayground.DiscoveryLog import DiscoveryLog
+from PyhulaPlayground import Instrumentation
 from PyhulaPlayground.Utils import optimized_paths
 
-file_name = "maze_challenge_2.txt"
+file_name = "maze_challenge_2.maze"
+# JSON maze used until a discovery writes file_name
+json_file_name = "maze_challenge_2.txt"
+discovery_log_file_name = "maze_challenge_2.discovery.log"
+
+# Load the object detector in the background when the GUI starts
+WARM_UP_VISION = True
 
 class Challenge2Controller:
-    def __init__(self):
+    def __init__(self, api=None, sleep=None, vision=None, clock=None):
+        # Drone backend, e.g. a Simulator.SimulatedUserApi, its sleep() and clock() and Simulator.create_vision;
+        # real hardware when None
+        self.api = api
+        self.sleep = sleep
+        # One connection reused by every discovery and race
+        self.session = DroneSession(None if api is None else lambda: api, sleep, vision, clock)
+        self.recorder = None
         self.num_objects = 0
         self.gui = None
         self.maze = None
@@ -17,6 +36,9 @@ class Challenge2Controller:
         self.found_count = 0
 
     def run(self):
+        if WARM_UP_VISION and self.api is None:
+            # Load the object detector while the user fills in the race
+            warm_up_vision()
         root = tk.Tk()
         self.gui = Gui(root, self.on_start_discovery, self.on_start_race)
         root.mainloop()
@@ -26,32 +48,47 @@ class Challenge2Controller:
         height = params['height']
         start = params['start']
         bearing = params['bearing']
+        # Continue an interrupted discovery of the same arena instead of starting over
+        resume = params.get('resume', False)
 
         self.on_progress("=== Challenge 2 Maze Discovery Started ===\n")
         self.on_progress(f"Start: {start}, Bearing: {bearing}\n\n")
 
         self.maze = Maze.Maze(width, height)
+        self.recorder = Instrumentation.new_recorder()
+        if resume:
+            self.report_resumable_cells(start)
 
         challenge_number = 2
         phase_number = 1
-        self.drone = Drone(bearing, challenge_number, phase_number)
+        self.drone = self.session.acquire(bearing, challenge_number, phase_number, recorder=self.recorder)
 
         self.on_progress("Taking off...\n")
         self.drone.take_off()
 
         self.on_progress("Starting maze discovery...\n")
-        PathFinder.discover_maze(self.maze, start, self.drone)
+        PathFinder.discover_maze(self.maze, start, self.drone, strategy="frontier", log_file=discovery_log_file_name,
+                                 resume=resume)
 
         self.on_progress("Saving maze to file...\n")
-        Utils.save_maze_to_file(self.maze, file_name)
+        Utils.save_maze_to_file(self.maze, file_name, binary=True)
+        DiscoveryLog(discovery_log_file_name).delete()
 
         self.on_progress("Landing...\n")
         self.drone.land()
 
         self.on_progress("Discovery complete!\n")
+        self.export_timeline("discovery")
 
         return
 
+    def report_resumable_cells(self, start):
+        cells = DiscoveryLog(discovery_log_file_name).count_resumable_cells(self.maze, start, "frontier")
+        if cells:
+            self.on_progress(f"Resuming interrupted discovery: {cells} cells already explored\n")
+        else:
+            self.on_progress("No interrupted discovery to resume, starting over\n")
+
     def on_start_race(self, params):
         start = params['start']
         bearing = params['bearing']
@@ -65,30 +102,39 @@ class Challenge2Controller:
         self.on_progress(f"Risky run value: {is_risky}\n\n")
 
         self.on_progress("loading maze...\n")
-        maze = Utils.load_maze_from_file(file_name)
+        maze = Utils.load_maze_from_files([file_name, json_file_name])
         maze_file_not_found = (maze is None)
         if maze_file_not_found:
             self.on_progress("\n***WARNING***: Maze file not found.\n")
             return
 
+        self.recorder = Instrumentation.new_recorder()
         self.found_count = 0
 
         challenge_number = 2
         phase_number = 2
-        self.drone = Drone(bearing, challenge_number, phase_number, is_risky)
-        object_coordinates = objects.keys()
 
-        self.on_progress("Calculating optimal path...\n")
-        paths = PathFinder.astar_multi_goal_straight_preference(maze, start, object_coordinates)
+        # Plan while the drone connects and takes off
+        self.on_progress("Taking off...\n")
+        self.drone, paths = asyncio.run(take_off_while_planning(
+            lambda: self.plan_race(maze, start, bearing, objects),
+            functools.partial(self.session.acquire, bearing, challenge_number, phase_number, is_risky,
+                              recorder=self.recorder)))
+        if paths is None:
+            self.on_progress("\n***WARNING***: No path to every object, landed.\n")
+            return
         self.on_progress(f"Path calculated: {len(paths)} segments\n\n")
         paths = optimized_paths(paths)
 
-        self.on_progress("Taking off...\n")
-        self.drone.take_off()
+        # Order the directions checked at each goal for the least yaw rotation over the mission
+        schedule = PathFinder.detection_schedule(bearing, [path[-1] for path in paths], objects)
 
         for i in range(len(paths)):
             self.on_progress(f"Traversing segment {i + 1}/{len(paths)}...\n")
-            self.drone.traverse_path(paths[i])
+            if not PathFinder.fly_race_path(maze, paths[i], self.drone):
+                # The next segment is flown from wherever the drone ended up
+                self.on_progress(f"\n***WARNING***: Could not reach {paths[i][-1]}, skipping its objects.\n")
+                continue
 
             # current_block = self.drone.get_current_block()
             # if current_block[0] >= maze.width:
@@ -109,7 +155,7 @@ class Challenge2Controller:
 
             current_block = (current_block_x, current_block_y)
 
-            for object_direction in objects[current_block]:
+            for object_direction in schedule[i]:
                 self.on_progress(f"Performing object detecting at {current_block} facing {object_direction}...\n")
                 print(f"(main): Performing object detection at block: {current_block} - direction: {object_direction}")
                 self.drone.perform_detection(object_direction, on_object_found=self.on_object_found)
@@ -118,14 +164,38 @@ class Challenge2Controller:
         self.drone.land()
 
         self.on_progress("\n=== Race Complete ===\n")
+        self.export_timeline("race")
+
+    def plan_race(self, maze, start, bearing, objects):
+        object_coordinates = objects.keys()
+        plan_query = {'planner': 'astar_multi_goal_straight_preference', 'cost_model': 'FlightTimeCost',
+                      'start': start, 'goals': sorted(object_coordinates), 'bearing': bearing,
+                      'detections': sorted((cell, sorted(directions)) for cell, directions in objects.items())}
+        paths = Utils.load_cached_plan(file_name, maze, plan_query)
+        if paths is None:
+            self.on_progress("Calculating optimal path...\n")
+            with Instrumentation.span(self.recorder, "planner", "astar_multi_goal_straight_preference"):
+                graph = JunctionGraph.JunctionGraph(maze)
+                paths = PathFinder.astar_multi_goal_straight_preference(maze, start, object_coordinates,
+                                                                        cost_model=PathFinder.FlightTimeCost(), graph=graph,
+                                                                        detections=objects, bearing=bearing)
+            if paths is not None:
+                Utils.save_cached_plan(file_name, maze, plan_query, paths)
+        else:
+            self.on_progress("Using cached path...\n")
+        return paths
 
     def on_object_found(self, object_name, direction, current_block):
         self.found_count += 1
         msg = f"{self.found_count}. Found a {object_name} at ({current_block[0]},{current_block[1]}) in {direction} direction\n"
         self.on_progress(msg)
-        if self.found_count == self.num_objects:
+        if self.found_count == self.num_objects and self.gui:
             self.gui.root.after(0, Challenge2Gui.alert_race_done)
 
+    def export_timeline(self, phase):
+        if self.recorder is not None:
+            self.recorder.export(f"challenge_2_{phase}")
+
     def on_progress(self, message):
         if self.gui:
             self.gui.write_output_threadsafe(message)
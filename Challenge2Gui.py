@@ -51,6 +51,11 @@ class Gui:
         # Default values
         self.objects_text.insert("1.0", "3,4,North\n3,3,West\n2,1,East\n2,0,South")
 
+        # Resume discovery checkbox
+        self.resume_value = tk.BooleanVar(value=False)
+        self.resume_checkbox = ttk.Checkbutton(main_frame, text="Resume interrupted discovery?", variable=self.resume_value)
+        self.resume_checkbox.grid(row=4, column=2, sticky=(tk.W, tk.N), pady=5)
+
 
         # Start Discovery Button
         self.start_discovery_button = ttk.Button(main_frame, text="Start Discovery", command=self._on_start_discovery_clicked)
@@ -88,17 +93,21 @@ class Gui:
 
             bearing = self.bearing_var.get()
 
+            resume = self.resume_value.get()
+
             params = {
                 'width': width,
                 'height': height,
                 'start': start,
-                'bearing': bearing
+                'bearing': bearing,
+                'resume': resume
             }
 
             message = (
                 f"Maze Size: {width}x{height}\n"
                 f"Start Position: {start}\n"
-                f"Drone Initial Bearing: {bearing}\n\n"
+                f"Drone Initial Bearing: {bearing}\n"
+                f"Resume interrupted discovery: {'Yes, trusting the walls it found' if resume else 'No'}\n\n"
                 f"This will delete existing maze text file.\n"
                 f"Make sure it is safe and you're clear for takeoff.\n\n"
                 f"Start discovery?"
@@ -0,0 +1,108 @@
+import json
+import os
+
+class DiscoveryLog:
+    """
+    Append-only log of a maze discovery, one JSON record per line, flushed to
+    disk as each cell is visited. After a crash or battery swap the log can
+    be replayed to rebuild the maze, the visited cells and the DFS stack, so
+    discovery resumes instead of re-flying the whole arena. Resuming trusts
+    the recorded walls, so it is only done when asked for.
+
+    Records:
+        {"event": "begin", "width": w, "height": h, "start": [x, y], "strategy": s}
+        {"event": "visit", "cell": [x, y], "walls": [[x, y], ...] or null if the scan was skipped}
+        {"event": "backtrack"}
+        {"event": "done"}
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.file = None
+
+    def read(self):
+        """Records written so far, ignoring a last line cut short by a crash"""
+        if not os.path.exists(self.filename):
+            return []
+        return self._complete_lines()[0]
+
+    def _complete_lines(self):
+        """(records, length): the records up to the first line cut short by a
+        crash, and the length in bytes of the lines they were read from"""
+        records = []
+        length = 0
+        with open(self.filename, 'rb') as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    break
+                length += len(line)
+        return records, length
+
+    def read_resumable(self, maze, start, strategy):
+        """Records after the begin record, or None if the log is missing, finished or for another discovery"""
+        records = self.read()
+        if not records:
+            return None
+        if records[-1].get('event') == 'done':
+            return None
+
+        begin = records[0]
+        if (begin.get('event') != 'begin' or
+                begin.get('width') != maze.width or
+                begin.get('height') != maze.height or
+                tuple(begin.get('start', ())) != tuple(start) or
+                begin.get('strategy') != strategy):
+            print(f"{self.filename} is for a different discovery, starting over")
+            return None
+
+        return records[1:]
+
+    def count_resumable_cells(self, maze, start, strategy):
+        """Cells the unfinished discovery in this log already explored, 0 if there is nothing to resume"""
+        records = self.read_resumable(maze, start, strategy)
+        if not records:
+            return 0
+        return len({tuple(record['cell']) for record in records if record['event'] == 'visit'})
+
+    def begin(self, maze, start, strategy):
+        """Start a new log, replacing any previous one"""
+        self.close()
+        self.file = open(self.filename, 'w')
+        self._write({'event': 'begin', 'width': maze.width, 'height': maze.height,
+                     'start': list(start), 'strategy': strategy})
+
+    def resume(self):
+        """Keep appending to the existing log, after dropping a last line cut short by a crash"""
+        self.close()
+        _, length = self._complete_lines()
+        os.truncate(self.filename, length)
+        self.file = open(self.filename, 'a')
+
+    def record_visit(self, cell, walls):
+        self._write({'event': 'visit', 'cell': list(cell),
+                     'walls': None if walls is None else [list(neighbor) for neighbor in walls]})
+
+    def record_backtrack(self):
+        self._write({'event': 'backtrack'})
+
+    def finish(self):
+        self._write({'event': 'done'})
+        self.close()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def delete(self):
+        self.close()
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def _write(self, record):
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
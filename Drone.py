@@ -1,13 +1,10 @@
-import pyhula
 import time
 import math
-import sys
-import cv2
 import os
+import threading
 import Utils
+import Instrumentation
 
-from .hula_video import hula_video
-from .onnxdetector import onnxdetector
 from datetime import datetime, timezone
 
 DEFAULT_HEIGHT = 90
@@ -16,159 +13,347 @@ MINIMUM_HEIGHT = 65
 LAST_STEP_HEIGHT = 40
 
 SPEED = 100
-SLEEP_BASE_VALUE = 0.4
-SLEEP_INCREMENT_VALUE = 0.1
 SLEEP_VALUE = 0.8
 
 OBJECT_DETECTION_MAX_TRIES = 100
 
+# Closed-loop arrival: after each leg, poll telemetry until the drone is within
+# ARRIVAL_TOLERANCE cm of the target and holding still, instead of sleeping for
+# the worst-case leg time, which stays the timeout
+ARRIVAL_DETECTION = False
+ARRIVAL_POLL_INTERVAL = 0.05
+ARRIVAL_TOLERANCE = 10
+ARRIVAL_STABLE_TOLERANCE = 6
+ARRIVAL_YAW_TOLERANCE = 6
+ARRIVAL_STABLE_READINGS = 2
+
+# Cells flown on dead reckoning before the tracked block is re-read from telemetry
+POSITION_RESYNC_DISTANCE = 12
+
+# locate_block() places the drone in a block when telemetry is within BLOCK_MARGIN
+# cm of the block's target coordinates on both axes
+BLOCK_MARGIN = 25
+
+# Object detector of Challenge 2 races. The vision stack (OpenCV, hula_video and
+# the ONNX runtime) is only imported when a race first needs it
+DETECTOR_MODEL = "detect_3_object_12_11.onnx"
+DETECTOR_LABELS = "object.txt"
+DETECTOR_CONFIDENCE = 0.4
+
+_detector = None
+_detector_lock = threading.Lock()
+
+def load_detector():
+    """The process-wide onnxdetector, loading the model on the first call only"""
+    global _detector
+    with _detector_lock:
+        if _detector is None:
+            from .onnxdetector import onnxdetector
+            _detector = onnxdetector(model=DETECTOR_MODEL, label=DETECTOR_LABELS, confidence_thres=DETECTOR_CONFIDENCE)
+        return _detector
+
+def warm_up_vision():
+    """Import the vision stack and load the detector on a background thread, returning the thread"""
+    thread = threading.Thread(target=_warm_up_vision, name="vision-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+def _warm_up_vision():
+    try:
+        import cv2
+        from .hula_video import hula_video
+        load_detector()
+    except Exception as e:
+        # The race loads the stack again and reports the error where it matters
+        print(f"Vision warm-up failed: {e}")
+
 LOGS_ENABLED = False
 def LOG(message):
     if LOGS_ENABLED:
         print(message)
 
+class Leg:
+    """One straight flight command: target block and coordinates, height, length in cells and wait afterwards"""
+    __slots__ = ("block", "x", "y", "z", "length", "wait")
+
+    def __init__(self, block, x, y, z, length, wait):
+        self.block = block
+        self.x = x
+        self.y = y
+        self.z = z
+        self.length = length
+        self.wait = wait
+
 class Drone:
-    def __init__(self, bearing="North", challenge=1, phase=1, risky=False):
-        self.api = pyhula.UserApi()
+    def __init__(self, bearing="North", challenge=1, phase=1, risky=False, api=None, sleep=None, recorder=None,
+                 vision=None, clock=None):
+        """
+        api: pyhula.UserApi-compatible object to fly with, e.g. a
+             Simulator.SimulatedUserApi; a new pyhula.UserApi by default
+        sleep: time.sleep() replacement for every wait, e.g. the simulator's
+               virtual clock
+        clock: time.monotonic() replacement matching sleep, e.g. the
+               simulator's clock(), timing arrival detection
+        recorder: Instrumentation.Recorder timing every API call, sleep and
+                  detection try; nothing is timed when None
+        vision: vision(api) returning the (video, detector) pair used in
+                Challenge 2 races, e.g. Simulator.create_vision; a hula_video
+                stream and the shared onnxdetector by default
+        """
+        if api is None:
+            import pyhula
+            api = pyhula.UserApi()
+        if sleep is None:
+            sleep = time.sleep
+        self.raw_api = api
+        self.raw_sleep = sleep
+        self.clock = time.monotonic if clock is None else clock
+        self.vision = vision
+        self.set_recorder(recorder)
         if not self.api.connect():
             print("connect error!!!!!!!")
-            sys.exit(0)
+            raise ConnectionError("Could not connect to the drone")
         else:
             print("connection to station by wifi")
 
+        # Settings last sent to the drone, None until first configured
+        self.barrier_mode = None
+        self.vid = None
+        self.huladetector = None
+
+        self.configure(bearing, challenge, phase, risky)
+
+        self.api.Plane_cmd_switch_QR(0)
+        self.sleep(SLEEP_VALUE)
+        print(f"Started challenge: {self.challenge_number}")
+        self.sleep(2)
+
+    def set_recorder(self, recorder):
+        """Time every API call, sleep and detection try into recorder from now on, or stop timing when None"""
+        self.recorder = recorder
+        self.api = self.raw_api
+        self.sleep = self.raw_sleep
+        if recorder is not None:
+            self.api = Instrumentation.InstrumentedApi(self.raw_api, recorder)
+            self.sleep = recorder.wrap("sleep", "sleep", self.raw_sleep)
+
+    def configure(self, bearing="North", challenge=1, phase=1, risky=False):
+        """
+        Prepare for a challenge phase, sending the drone only the settings
+        that differ from the ones already applied on this connection, so a
+        DroneSession can reuse one Drone across discoveries and races.
+        """
         self.is_risky = risky
 
         self.challenge_number = challenge
         self.phase_number = phase
         self.current_bearing = bearing
         self.challenge_height = DEFAULT_HEIGHT
-
-        if self.phase_number == 1:
-            self.api.single_fly_barrier_aircraft(True)
-            time.sleep(SLEEP_VALUE)
-
-        if self.challenge_number == 2 and self.phase_number == 2:
+        self.arrival_detection = ARRIVAL_DETECTION
+
+        # Dead-reckoned position: the last commanded or confirmed block and height,
+        # None until first read from telemetry
+        self.block = None
+        self.height = None
+        self.distance_since_resync = 0
+
+        # Obstacle avoidance is on for discovery; a fresh connection starts with it off
+        barrier_mode = self.phase_number == 1
+        if barrier_mode != bool(self.barrier_mode):
+            self.api.single_fly_barrier_aircraft(barrier_mode)
+            self.sleep(SLEEP_VALUE)
+        self.barrier_mode = barrier_mode
+
+        if self.challenge_number == 2 and self.phase_number == 2 and self.vid is None:
             self.api.Plane_cmd_camera_angle(4, 0)
-            self.vid = hula_video(hula_api = self.api, display = False)
-            self.huladetector = onnxdetector(model="detect_3_object_12_11.onnx", label="object.txt", confidence_thres=0.4)
+            if self.vision is not None:
+                self.vid, self.huladetector = self.vision(self.raw_api)
+            else:
+                from .hula_video import hula_video
+                self.vid = hula_video(hula_api = self.api, display = False)
+                self.huladetector = load_detector()
             self.vid.video_mode_on()
 
-        self.api.Plane_cmd_switch_QR(0)
-        time.sleep(SLEEP_VALUE)
-        print(f"Started challenge: {self.challenge_number}")
-        time.sleep(2)
-
     def take_off(self):
         print("+++++ taking off")
-        time.sleep(SLEEP_VALUE)
+        self.sleep(SLEEP_VALUE)
         self.api.single_fly_takeoff()
-        time.sleep(SLEEP_VALUE)
+        self.sleep(SLEEP_VALUE)
 
     def land(self):
         print("----- landing")
         self.api.single_fly_touchdown()
-        if self.challenge_number == 2:
+        if self.vid is not None:
             self.vid.close()
+            self.vid = None
 
     def move_to_coordinates(self, x, y, z, sleep=SLEEP_VALUE):
         LOG(f"move_to_coordinates()::: moving to coordinates: [X: {x}, Y: {y}, Z: {z}], followed by sleep value: {sleep}")
         self.api.single_fly_straight_flight(x, y, z, SPEED)
-        time.sleep(sleep)
+        self.height = z
+        return self.settle(x, y, sleep)
+
+    def settle(self, x, y, wait):
+        """
+        Timing policy after every flight command: poll for arrival at (x, y)
+        with closed-loop arrival detection, otherwise sleep for the worst-case
+        wait. A wait of 0, as in risky mode, sends the next command at once.
+        Returns True when arrival was confirmed from telemetry.
+        """
+        if wait <= 0:
+            return False
+        if self.arrival_detection:
+            return self.wait_for_arrival(x, y, wait)
+        self.sleep(wait)
+        return False
+
+    def wait_for_arrival(self, x, y, timeout):
+        """
+        Poll position and yaw every ARRIVAL_POLL_INTERVAL seconds until the
+        drone is within ARRIVAL_TOLERANCE of (x, y) and its last
+        ARRIVAL_STABLE_READINGS readings barely moved, or until timeout seconds
+        have passed on the clock, telemetry round trips included. Returns True
+        on arrival, False on timeout.
+        """
+        started = self.clock()
+        stable_readings = 0
+        previous = None
+        while True:
+            current_x, current_y, _ = self.api.get_coordinate()
+            yaw, _, _ = self.api.get_yaw()
+            waited = self.clock() - started
+
+            if abs(current_x - x) <= ARRIVAL_TOLERANCE and abs(current_y - y) <= ARRIVAL_TOLERANCE and previous is not None and \
+                    abs(current_x - previous[0]) <= ARRIVAL_STABLE_TOLERANCE and \
+                    abs(current_y - previous[1]) <= ARRIVAL_STABLE_TOLERANCE and \
+                    abs((yaw - previous[2] + 180) % 360 - 180) <= ARRIVAL_YAW_TOLERANCE:
+                stable_readings += 1
+                if stable_readings >= ARRIVAL_STABLE_READINGS:
+                    LOG(f"wait_for_arrival()::: arrived at [X: {x}, Y: {y}] after {waited:.2f}s")
+                    return True
+            else:
+                stable_readings = 0
+            previous = (current_x, current_y, yaw)
+
+            if waited >= timeout:
+                LOG(f"wait_for_arrival()::: no stable arrival at [X: {x}, Y: {y}] within {timeout:.2f}s")
+                return False
+            self.sleep(min(ARRIVAL_POLL_INTERVAL, timeout - waited))
 
     def move_to_block(self, x, y, z=DEFAULT_HEIGHT, is_last_step=False):
         LOG(f"move_to_block()::: moving to block: [X: {x}, Y: {y}]")
-        current_block = self.get_current_block()
-        LOG(f"move_to_block()::: current block: [X: {current_block[0]}, Y: {current_block[0]}]")
+        leg = self.leg_to(self.tracked_block(), x, y, z, is_last_step)
+        if leg is not None:
+            self.fly_legs([leg])
+
+    def leg_to(self, current_block, x, y, z=DEFAULT_HEIGHT, is_last_step=False):
+        """The flight command from current_block to block (x, y), or None when already there"""
+        LOG(f"leg_to()::: current block: [X: {current_block[0]}, Y: {current_block[1]}]")
 
         if current_block[0] == x and current_block[1] == y:
-            LOG(f"move_to_block()::: already at target block")
-            return
+            LOG(f"leg_to()::: already at target block")
+            return None
 
         movement_length = Utils.length(current_block, (x,y))
-        sleep_value = SLEEP_BASE_VALUE + (movement_length * SLEEP_INCREMENT_VALUE)
+        sleep_value = Utils.leg_time(movement_length)
 
         if self.is_risky:
             sleep_value = 0
 
         target_x = 60 * x + 15
         target_y = 60 * y + 15
-        LOG(f"move_to_block()::: target coordinates: [X: {target_x}, Y: {target_y}], Z:{z}")
         if is_last_step:
             z = LAST_STEP_HEIGHT
-        self.move_to_coordinates(target_x, target_y, z, sleep_value)
-
-    def traverse_path(self, path):
-        if self.challenge_number == 1:
-            index = 0
-            for x, y in path:
+        LOG(f"leg_to()::: target coordinates: [X: {target_x}, Y: {target_y}], Z:{z}")
+        return Leg((x, y), target_x, target_y, z, movement_length, sleep_value)
+
+    def plan_legs(self, path):
+        """
+        Every flight command of a path, computed before the first one is sent:
+        target coordinates, heights (descending towards the goal in
+        challenge 1) and the worst-case wait after each leg.
+        """
+        legs = []
+        block = self.tracked_block()
+        for index, (x, y) in enumerate(path):
+            z = DEFAULT_HEIGHT
+            is_last_step = False
+            if self.challenge_number == 1:
                 self.challenge_height = self.challenge_height - DESCENDING_INCREMENTAL_VALUE
                 if self.challenge_height < MINIMUM_HEIGHT:
                     self.challenge_height = MINIMUM_HEIGHT
+                z = self.challenge_height
+                is_last_step = (index == len(path) - 1)
+
+            leg = self.leg_to(block, x, y, z, is_last_step)
+            if leg is not None:
+                legs.append(leg)
+                block = leg.block
+        return legs
+
+    def fly_legs(self, legs):
+        """Dispatch planned legs back to back, each as soon as the previous one has settled"""
+        for leg in legs:
+            self.api.single_fly_straight_flight(leg.x, leg.y, leg.z, SPEED)
+            self.height = leg.z
+            arrived = self.settle(leg.x, leg.y, leg.wait)
+
+            self.block = leg.block
+            if arrived:
+                # Arrival was confirmed from telemetry
+                self.distance_since_resync = 0
+            else:
+                self.distance_since_resync += leg.length
+                if self.distance_since_resync >= POSITION_RESYNC_DISTANCE:
+                    self.get_current_block()
+
+    def tracked_block(self):
+        """Dead-reckoned current block, re-read from telemetry when unknown or
+        after POSITION_RESYNC_DISTANCE cells without a confirmed position"""
+        if self.block is None or self.distance_since_resync >= POSITION_RESYNC_DISTANCE:
+            LOG(f"tracked_block()::: resyncing position from telemetry")
+            self.get_current_block()
+        return self.block
 
-                is_last_step = False
-                if (index == len(path) - 1):
-                    is_last_step = True
-                self.move_to_block(x, y, self.challenge_height, is_last_step)
-                index = index + 1
-
-        if self.challenge_number == 2:
-            for x, y in path:
-                self.move_to_block(x, y, DEFAULT_HEIGHT)
+    def traverse_path(self, path):
+        self.fly_legs(self.plan_legs(path))
 
     def turn_to_bearing(self, direction):
-        if self.current_bearing == "North":
-            if direction == "West":
-                self.api.single_fly_turnleft(90)
-            elif direction == "South":
-                self.api.single_fly_turnleft(180)
-            elif direction == "East":
-                self.api.single_fly_turnright(90)
-        elif self.current_bearing == "West":
-            if direction == "South":
-                self.api.single_fly_turnleft(90)
-            elif direction == "East":
-                self.api.single_fly_turnleft(180)
-            elif direction == "North":
-                self.api.single_fly_turnright(90)
-        elif self.current_bearing == "South":
-            if direction == "East":
-                self.api.single_fly_turnleft(90)
-            elif direction == "North":
-                self.api.single_fly_turnleft(180)
-            elif direction == "West":
-                self.api.single_fly_turnright(90)
-        elif self.current_bearing == "East":
-            if direction == "North":
-                self.api.single_fly_turnleft(90)
-            elif direction == "West":
-                self.api.single_fly_turnleft(180)
-            elif direction == "South":
-                self.api.single_fly_turnright(90)
-
+        """Yaw in place to face direction; pyhula's turn commands return once the turn is done"""
+        turn = (Utils.bearing_yaw(direction) - Utils.bearing_yaw(self.current_bearing)) % 360
+        if turn == 90:
+            self.api.single_fly_turnright(90)
+        elif turn == 180:
+            self.api.single_fly_turnleft(180)
+        elif turn == 270:
+            self.api.single_fly_turnleft(90)
         self.current_bearing = direction
-        return
 
     def perform_detection(self, direction, current_block=None,on_object_found=None, on_progress=None):
         print(f"+++++ Performing object detection at direction {direction}")
         self.turn_to_bearing(direction)
-        if current_block is None:
-            current_block = self.get_current_block()
-        cell_file_name = f"Cell({current_block[0]}, {current_block[1]})_{direction}_"
         if not self.is_risky:
             self.center_at_current_block()
+        if current_block is None:
+            current_block = self.tracked_block()
+        cell_file_name = f"Cell({current_block[0]}, {current_block[1]})_{direction}_"
         self.vid.startrecording(cell_file_name)
         object_found = False
         for i in range(OBJECT_DETECTION_MAX_TRIES):
-            frame = self.vid.get_video()
+            with Instrumentation.span(self.recorder, "detection", "get_video"):
+                frame = self.vid.get_video()
             LOG(f"started self.huladetector.detect(frame)")
-            obj_found, frame = self.huladetector.detect(frame)
+            with Instrumentation.span(self.recorder, "detection", "detect"):
+                obj_found, frame = self.huladetector.detect(frame)
             LOG(f"ended self.huladetector.detect(frame)")
 
             if not obj_found is None:
                 timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
                 filename = f"{obj_found['label']}_{cell_file_name}{timestamp}.jpg"
                 savepath = os.path.join(os.getcwd(), 'detected_objects')
-                cv2.imwrite(os.path.join(savepath, filename), frame)
+                if frame is not None:
+                    import cv2
+                    cv2.imwrite(os.path.join(savepath, filename), frame)
                 print(f"Found {obj_found} after {i + 1} tries")
                 print(f"Saving to file: {filename}")
                 object_found = True
@@ -235,21 +420,50 @@ class Drone:
         if block_y < 0:
             block_y = 0
         LOG(f"get_current_block()::: current block: [X: {block_x}, Y: {block_y}]")
+        self.block = (block_x, block_y)
+        self.height = z
+        self.distance_since_resync = 0
         return block_x, block_y
 
-    def center_at_current_block(self):
-        LOG(f"center_at_current_block()::: centering at current block")
+    def locate_block(self):
+        """
+        The block the drone is in, from telemetry, or None when unsure: the
+        block whose target coordinates are within BLOCK_MARGIN of the
+        measured position. A reading further from every target, e.g. after
+        an undershoot, is followed by one move onto the nearest target and a
+        second reading.
+        """
+        block, offset = self.nearest_block()
+        if offset > BLOCK_MARGIN:
+            LOG(f"locate_block()::: {offset:.0f} cm from block {block}, moving onto it")
+            self.move_to_coordinates(block[0] * 60 + 15, block[1] * 60 + 15, self.height)
+            block, offset = self.nearest_block()
+        if offset > BLOCK_MARGIN:
+            LOG(f"locate_block()::: still {offset:.0f} cm from block {block}")
+            return None
+        return block
+
+    def nearest_block(self):
+        """(block, offset): the block whose target coordinates are nearest the
+        measured position, and the larger of the x and y distances to them in cm"""
         x, y, z = self.api.get_coordinate()
-        LOG(f"center_at_current_block()::: current coordinates: [X: {x}, Y: {y}, Z: {z}]")
+        block_x = max(round((x - 15) / 60.0), 0)
+        block_y = max(round((y - 15) / 60.0), 0)
+        offset = max(abs(x - (block_x * 60 + 15)), abs(y - (block_y * 60 + 15)))
+        self.block = (block_x, block_y)
+        self.height = z
+        self.distance_since_resync = 0
+        return self.block, offset
 
-        if x < 0:
-            x = 0
-        if y < 0:
-            y = 0
-        LOG(f"center_at_current_block()::: after zeroing: [X: {x}, Y: {y}, Z: {z}]")
+    def center_at_current_block(self):
+        LOG(f"center_at_current_block()::: centering at current block")
+        # Read telemetry rather than the tracked block, catching any drift into a neighboring block
+        block_x, block_y = self.get_current_block()
+        z = self.height
+        LOG(f"center_at_current_block()::: current block: [X: {block_x}, Y: {block_y}, Z: {z}]")
 
-        center_x = math.floor(x / 60.0) * 60 + 15
-        center_y = math.floor(y / 60.0) * 60 + 15
+        center_x = block_x * 60 + 15
+        center_y = block_y * 60 + 15
         LOG(f"center_at_current_block()::: center coordinates: [X: {center_x}, Y: {center_y}, Z: {z}")
         self.move_to_coordinates(center_x, center_y, z, 0)
 
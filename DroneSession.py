@@ -0,0 +1,68 @@
+import time
+from .Drone import Drone
+
+RECONNECT_ATTEMPTS = 3
+RECONNECT_DELAY = 1.0
+
+class DroneSession:
+    """
+    Long-lived drone connection shared by every discovery and race a GUI
+    runs. The first acquire() connects and configures a Drone; later ones
+    reuse it, re-sending only the settings that changed for the new phase
+    (obstacle avoidance, camera and vision) and skipping the connect, QR
+    switch and start-up sleeps. A connection that stopped answering
+    telemetry is replaced by a new one, retried RECONNECT_ATTEMPTS times.
+
+    Args:
+        api_factory: callable returning a new pyhula.UserApi-compatible object
+                     for each connection, e.g. lambda: simulated_api; a new
+                     pyhula.UserApi when None
+        sleep: time.sleep() replacement passed to the Drone
+        vision: (video, detector) factory passed to the Drone
+        clock: time.monotonic() replacement passed to the Drone
+    """
+    def __init__(self, api_factory=None, sleep=None, vision=None, clock=None):
+        self.api_factory = api_factory
+        self.sleep = time.sleep if sleep is None else sleep
+        self.vision = vision
+        self.clock = clock
+        self.drone = None
+        self.connections = 0
+
+    def acquire(self, bearing="North", challenge=1, phase=1, risky=False, recorder=None):
+        """The session's Drone, connected and configured for the given phase"""
+        if self.drone is not None and not self.is_alive():
+            print("Drone connection lost, reconnecting")
+            self.drone = None
+
+        if self.drone is None:
+            self.drone = self.connect(bearing, challenge, phase, risky, recorder)
+        else:
+            self.drone.set_recorder(recorder)
+            self.drone.configure(bearing, challenge, phase, risky)
+        return self.drone
+
+    def connect(self, bearing, challenge, phase, risky, recorder):
+        for attempt in range(1, RECONNECT_ATTEMPTS + 1):
+            try:
+                api = None if self.api_factory is None else self.api_factory()
+                drone = Drone(bearing, challenge, phase, risky, api=api, sleep=self.sleep, recorder=recorder,
+                              vision=self.vision, clock=self.clock)
+                self.connections += 1
+                return drone
+            except OSError as e:
+                print(f"Connection attempt {attempt}/{RECONNECT_ATTEMPTS} failed: {e}")
+                if attempt == RECONNECT_ATTEMPTS:
+                    raise
+                self.sleep(RECONNECT_DELAY)
+
+    def is_alive(self):
+        """Whether the drone still answers a telemetry request"""
+        try:
+            return self.drone.raw_api.get_coordinate() is not None
+        except Exception:
+            return False
+
+    def invalidate(self):
+        """Drop the connection so the next acquire() reconnects, e.g. after a failed mission"""
+        self.drone = None
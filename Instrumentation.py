@@ -0,0 +1,170 @@
+import bisect
+import contextlib
+import csv
+import json
+import os
+import time
+from datetime import datetime
+
+# Record a timeline for every mission the controllers run
+ENABLED = False
+
+TIMELINE_DIRECTORY = "timelines"
+
+# Histogram bucket upper bounds, in seconds
+BUCKET_BOUNDS = [0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0]
+
+# Shared no-op context returned by span() when nothing is recorded
+NO_SPAN = contextlib.nullcontext()
+
+class Recorder:
+    """
+    Timeline of timed operations during one mission, grouped by category:
+    "api" for every drone API call (a wifi round trip), "sleep" for settle
+    sleeps, "detection" for video frames and inference tries and "planner"
+    for path planning.
+
+    clock defaults to time.perf_counter; pass the simulator's virtual clock,
+    e.g. lambda: api.elapsed, to time a time-warped simulated mission.
+    """
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.origin = clock()
+        # (start offset, category, operation, duration in seconds)
+        self.events = []
+
+    def record(self, category, operation, started, duration):
+        self.events.append((started - self.origin, category, operation, duration))
+
+    def span(self, category, operation):
+        return _Span(self, category, operation)
+
+    def wrap(self, category, operation, function):
+        """function, recording the duration of every call"""
+        clock = self.clock
+
+        def timed(*args, **kwargs):
+            started = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(category, operation, started, clock() - started)
+        return timed
+
+    def summary(self):
+        """
+        Per-operation statistics, keyed by "category.operation", plus
+        per-category totals keyed by category.
+        """
+        durations = {}
+        totals = {}
+        for _, category, operation, duration in self.events:
+            durations.setdefault(f"{category}.{operation}", []).append(duration)
+            totals[category] = totals.get(category, 0.0) + duration
+
+        summary = {}
+        for key, values in sorted(durations.items()):
+            values.sort()
+            histogram = [0] * (len(BUCKET_BOUNDS) + 1)
+            for value in values:
+                histogram[bisect.bisect_left(BUCKET_BOUNDS, value)] += 1
+            summary[key] = {
+                'count': len(values),
+                'total': sum(values),
+                'mean': sum(values) / len(values),
+                'p50': values[len(values) // 2],
+                'p95': values[min(len(values) - 1, int(len(values) * 0.95))],
+                'max': values[-1],
+                'histogram': histogram
+            }
+        for category, total in totals.items():
+            summary[category] = {'total': total}
+        return summary
+
+    def export_json(self, filename):
+        with open(filename, 'w') as f:
+            json.dump({'bucket_bounds': BUCKET_BOUNDS,
+                       'summary': self.summary(),
+                       'events': [{'start': start, 'category': category, 'operation': operation, 'duration': duration}
+                                  for start, category, operation, duration in self.events]}, f, indent=2)
+
+    def export_csv(self, filename):
+        with open(filename, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['start', 'category', 'operation', 'duration'])
+            writer.writerows(self.events)
+
+    def export(self, name, directory=TIMELINE_DIRECTORY):
+        """Write <name>_<timestamp>.json and .csv timelines to directory, returning the JSON filename"""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"{name}_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}")
+        self.export_json(base + ".json")
+        self.export_csv(base + ".csv")
+        print(f"Mission timeline saved to {base}.json")
+        return base + ".json"
+
+    def print_summary(self):
+        summary = self.summary()
+        for key, stats in summary.items():
+            if 'count' in stats:
+                print(f"{key:<48} {stats['count']:>6} calls {stats['total']:9.3f} s total "
+                      f"{stats['mean'] * 1000:9.2f} ms mean {stats['p95'] * 1000:9.2f} ms p95")
+        for key, stats in summary.items():
+            if 'count' not in stats:
+                print(f"{key:<48} {stats['total']:9.3f} s total")
+
+class _Span:
+    __slots__ = ("recorder", "category", "operation", "started")
+
+    def __init__(self, recorder, category, operation):
+        self.recorder = recorder
+        self.category = category
+        self.operation = operation
+
+    def __enter__(self):
+        self.started = self.recorder.clock()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.recorder.record(self.category, self.operation, self.started, self.recorder.clock() - self.started)
+        return False
+
+def span(recorder, category, operation):
+    """Context timing one operation into recorder, or doing nothing when recorder is None"""
+    if recorder is None:
+        return NO_SPAN
+    return recorder.span(category, operation)
+
+def new_recorder(clock=time.perf_counter):
+    """A Recorder when instrumentation is ENABLED, otherwise None"""
+    return Recorder(clock) if ENABLED else None
+
+class ApiProxy:
+    """
+    Proxy of a pyhula.UserApi handing each method through wrap(name, method)
+    the first time it is used; attributes that are not methods pass through.
+    """
+    def __init__(self, api):
+        self._api = api
+
+    def __getattr__(self, name):
+        attribute = getattr(self._api, name)
+        if not callable(attribute):
+            return attribute
+
+        wrapped = self.wrap(name, attribute)
+        # Cache the wrapper so later calls skip __getattr__
+        setattr(self, name, wrapped)
+        return wrapped
+
+    def wrap(self, name, method):
+        raise NotImplementedError
+
+class InstrumentedApi(ApiProxy):
+    """Proxy of a pyhula.UserApi timing every method call into a Recorder"""
+    def __init__(self, api, recorder):
+        super().__init__(api)
+        self._recorder = recorder
+
+    def wrap(self, name, method):
+        return self._recorder.wrap("api", name, method)
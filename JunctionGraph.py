@@ -0,0 +1,166 @@
+import heapq
+import PathFinder
+
+class Edge:
+    """A corridor between two graph nodes, stored with the cells it covers"""
+    __slots__ = ("end", "cells", "headings", "length", "turns", "rest_costs")
+
+    def __init__(self, cells):
+        self.end = cells[-1]
+        self.cells = cells
+        self.headings = [(cells[i + 1][0] - cells[i][0], cells[i + 1][1] - cells[i][1]) for i in range(len(cells) - 1)]
+        self.length = len(cells) - 1
+        self.turns = PathFinder.count_turns(cells)
+        self.rest_costs = {}
+
+    def cost(self, cost_model, cost, heading):
+        """Cost after flying this corridor, having arrived at its first cell with heading"""
+        cost = cost_model.step(cost, heading, self.headings[0])
+
+        # Cost of the corridor after its first step does not depend on the arrival heading
+        rest = self.rest_costs.get(type(cost_model))
+        if rest is None:
+            rest = cost_model.zero
+            for i in range(1, len(self.headings)):
+                rest = cost_model.step(rest, self.headings[i - 1], self.headings[i])
+            self.rest_costs[type(cost_model)] = rest
+
+        return cost_model.add(cost, rest)
+
+class JunctionGraph:
+    """
+    Maze contracted to a weighted graph. Junctions (3-4 open sides) and dead ends
+    (0-1 open sides) become nodes, while corridor cells with exactly two open
+    sides, straight or cornering, are folded into the edges between them. Each
+    edge keeps its cells, corridor length and turn count, so planned routes
+    expand back to the same cell paths PathFinder returns.
+
+    The graph is a snapshot: build a new one after adding walls to the maze.
+    """
+    def __init__(self, maze):
+        self.maze = maze
+        self.nodes = set()
+        self.edges = {}
+        self.expansions = 0
+
+        for y in range(maze.height):
+            for x in range(maze.width):
+                if len(maze.get_neighbors((x, y))) != 2:
+                    self.nodes.add((x, y))
+
+        for node in self.nodes:
+            self.edges[node] = []
+            for neighbor in maze.get_neighbors(node):
+                self.edges[node].append(Edge(self._walk(node, neighbor, self.nodes.__contains__)))
+
+        PathFinder.LOG(f"JunctionGraph()::: {maze.width}x{maze.height} maze contracted to {len(self.nodes)} nodes")
+
+    def _walk(self, origin, first_cell, is_stop):
+        """Follow a corridor from origin through first_cell until reaching a stop cell.
+        Origin is always a stop cell, so a closed loop ends back at origin."""
+        cells = [origin]
+        previous = origin
+        current = first_cell
+        while not is_stop(current):
+            cells.append(current)
+            neighbors = self.maze.get_neighbors(current)
+            next_cell = neighbors[0] if neighbors[0] != previous else neighbors[1]
+            previous = current
+            current = next_cell
+        cells.append(current)
+        return cells
+
+    def _query_edges(self, start, goal):
+        """Temporary edges connecting a start or goal that lies inside a corridor"""
+        def is_stop(cell):
+            return cell in self.nodes or cell == start or cell == goal
+
+        extra = {}
+        if start not in self.nodes:
+            extra[start] = []
+            for neighbor in self.maze.get_neighbors(start):
+                extra[start].append(Edge(self._walk(start, neighbor, is_stop)))
+
+        if goal not in self.nodes:
+            for neighbor in self.maze.get_neighbors(goal):
+                cells = self._walk(goal, neighbor, is_stop)
+                end = cells[-1]
+                if end == start and start not in self.nodes:
+                    # Already covered by the walk out of start
+                    continue
+                extra.setdefault(end, []).append(Edge(cells[::-1]))
+
+        return extra
+
+    def astar(self, start, goal, cost_model=None):
+        """
+        A* over (node, heading) states of the contracted graph.
+        Gives the same cost as PathFinder.astar_heading_state() while only
+        expanding junctions and dead ends.
+
+        Args:
+            start: (x, y) starting position
+            goal: (x, y) goal position
+            cost_model: PathFinder.TurnCountCost (default) or PathFinder.FlightTimeCost
+
+        Returns:
+            list of (x, y) cells from start to goal, or None if no path exists
+        """
+        if cost_model is None:
+            cost_model = PathFinder.TURN_COUNT_COST
+
+        self.expansions = 0
+        if start == goal:
+            return [start]
+
+        extra = self._query_edges(start, goal)
+
+        counter = 0
+        start_state = (start, None)
+        open_set = [(cost_model.estimate(PathFinder.heuristic(start, goal)), counter, start_state)]
+        counter += 1
+
+        came_from = {}
+        g_score = {start_state: cost_model.zero}
+        closed = set()
+
+        while open_set:
+            _, _, state = heapq.heappop(open_set)
+            if state in closed:
+                continue
+            closed.add(state)
+            self.expansions += 1
+
+            current, heading = state
+            if current == goal:
+                return self._expand_path(came_from, state)
+
+            cost = g_score[state]
+            for edge in self.edges.get(current, []) + extra.get(current, []):
+                neighbor_state = (edge.end, edge.headings[-1])
+                if neighbor_state in closed:
+                    continue
+
+                tentative_g = edge.cost(cost_model, cost, heading)
+
+                if neighbor_state not in g_score or tentative_g < g_score[neighbor_state]:
+                    came_from[neighbor_state] = (state, edge)
+                    g_score[neighbor_state] = tentative_g
+                    f_score = cost_model.add(tentative_g, cost_model.estimate(PathFinder.heuristic(edge.end, goal)))
+                    heapq.heappush(open_set, (f_score, counter, neighbor_state))
+                    counter += 1
+
+        print("No path exists")
+        return None
+
+    def _expand_path(self, came_from, state):
+        """Join the corridor cells of every edge on the route back into a cell path"""
+        edges = []
+        while state in came_from:
+            state, edge = came_from[state]
+            edges.append(edge)
+
+        path = [edges[-1].cells[0]]
+        for edge in reversed(edges):
+            path.extend(edge.cells[1:])
+        return path
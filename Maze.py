@@ -1,21 +1,124 @@
+# Wall bits stored per cell, one per side
+NORTH = 1
+EAST = 2
+SOUTH = 4
+WEST = 8
+
+# (dx, dy, wall bit) in the neighbor order used by get_neighbors()
+DIRECTIONS = [(0, 1, NORTH), (1, 0, EAST), (0, -1, SOUTH), (-1, 0, WEST)]
+
+DIRECTION_BITS = {(dx, dy): bit for dx, dy, bit in DIRECTIONS}
+
+OPPOSITE_BITS = {
+    NORTH: SOUTH,
+    EAST: WEST,
+    SOUTH: NORTH,
+    WEST: EAST
+}
+
 class Maze:
-    def __init__(self, width, height):
+    def __init__(self, width, height, cells=None, wall_count=0):
         self.width = width
         self.height = height
-        self.walls = set()
+        # One byte per cell holding its N/E/S/W wall bits, indexed by y * width + x.
+        # Any writable byte buffer works, e.g. the bytes read from a binary maze file.
+        self.cells = bytearray(width * height) if cells is None else cells
+        self.wall_count = wall_count
+
+    def in_bounds(self, cell):
+        return 0 <= cell[0] < self.width and 0 <= cell[1] < self.height
 
     def add_wall(self, cell1, cell2):
-        self.walls.add(frozenset([cell1, cell2]))
+        bit = DIRECTION_BITS.get((cell2[0] - cell1[0], cell2[1] - cell1[1]))
+        if bit is None:
+            return
+
+        added = False
+        if self.in_bounds(cell1):
+            index = cell1[1] * self.width + cell1[0]
+            if not self.cells[index] & bit:
+                self.cells[index] |= bit
+                added = True
+        if self.in_bounds(cell2):
+            index = cell2[1] * self.width + cell2[0]
+            opposite = OPPOSITE_BITS[bit]
+            if not self.cells[index] & opposite:
+                self.cells[index] |= opposite
+                added = True
+
+        if added:
+            self.wall_count += 1
 
     def is_passable(self, from_cell, to_cell):
-        return frozenset([from_cell, to_cell]) not in self.walls
+        bit = DIRECTION_BITS.get((to_cell[0] - from_cell[0], to_cell[1] - from_cell[1]))
+        if bit is None:
+            return True
+        if self.in_bounds(from_cell):
+            return not self.cells[from_cell[1] * self.width + from_cell[0]] & bit
+        if self.in_bounds(to_cell):
+            return not self.cells[to_cell[1] * self.width + to_cell[0]] & OPPOSITE_BITS[bit]
+        return True
 
     def get_neighbors(self, cell):
         x, y = cell
+        width = self.width
+        height = self.height
+        walls = self.cells[y * width + x] if self.in_bounds(cell) else 0
         neighbors = []
-        for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
+        for dx, dy, bit in DIRECTIONS:
             nx, ny = x + dx, y + dy
-            if 0 <= nx < self.width and 0 <= ny < self.height:
-                if self.is_passable(cell, (nx, ny)):
-                    neighbors.append((nx, ny))
+            if 0 <= nx < width and 0 <= ny < height and not walls & bit:
+                neighbors.append((nx, ny))
         return neighbors
+
+    def shrink_to(self, width, height):
+        """
+        Drop every cell outside width x height, keeping the origin. Walls
+        between kept and dropped cells are dropped too: like in a maze built
+        at the smaller size, the outer edge is implied by the bounds and never
+        stored in the cell bits.
+        """
+        cells = bytearray(width * height)
+        for y in range(min(height, self.height)):
+            row = self.cells[y * self.width:y * self.width + min(width, self.width)]
+            cells[y * width:y * width + len(row)] = row
+
+        for x in range(width):
+            cells[(height - 1) * width + x] &= ~NORTH
+            cells[x] &= ~SOUTH
+        for y in range(height):
+            cells[y * width + width - 1] &= ~EAST
+            cells[y * width] &= ~WEST
+
+        self.width = width
+        self.height = height
+        self.cells = cells
+        self.wall_count = self.count_walls()
+
+    def count_walls(self):
+        """Count walls from the cell bits, each interior wall once"""
+        count = 0
+        for index, bits in enumerate(self.cells):
+            if not bits:
+                continue
+            x, y = index % self.width, index // self.width
+            for dx, dy, bit in DIRECTIONS:
+                if not bits & bit:
+                    continue
+                # Interior walls are stored on both cells; count them from the north/east side only
+                if bit in (NORTH, EAST) or not self.in_bounds((x + dx, y + dy)):
+                    count += 1
+        return count
+
+    @property
+    def walls(self):
+        """Walls as a set of frozenset([cell1, cell2]) pairs, rebuilt from the cell bits"""
+        walls = set()
+        for index, bits in enumerate(self.cells):
+            if not bits:
+                continue
+            cell = (index % self.width, index // self.width)
+            for dx, dy, bit in DIRECTIONS:
+                if bits & bit:
+                    walls.add(frozenset([cell, (cell[0] + dx, cell[1] + dy)]))
+        return walls
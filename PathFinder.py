@@ -1,15 +1,169 @@
 import heapq
+from array import array
+import Utils
+from DiscoveryLog import DiscoveryLog
+from Maze import NORTH, EAST, SOUTH, WEST, OPPOSITE_BITS
+from Maze import DIRECTIONS as MAZE_DIRECTIONS
+from Maze import DIRECTION_BITS as MAZE_DIRECTION_BITS
+
+UNREACHABLE = -1
+ALL_SIDES = NORTH | EAST | SOUTH | WEST
+INFINITY = float('inf')
+
+# Goal counts up to which the multi-goal planner brute-forces or solves exactly
+MAX_PERMUTATION_GOALS = 4
+MAX_EXACT_GOALS = 12
+HEURISTIC_TIME_LIMIT = 1.0
+
+# Scan-and-replan rounds fly_race_path() makes before giving up on a waypoint
+RACE_CORRECTION_ROUNDS = 8
 
 LOGS_ENABLED = True
 def LOG(message):
     if LOGS_ENABLED:
         print(message)
 
+# Nodes expanded by the grid A* searches since the last reset_expansions()
+expansions = 0
+
+def reset_expansions():
+    global expansions
+    expansions = 0
+
+def _count_expansions(count):
+    global expansions
+    expansions += count
+
 def heuristic(cell, goal):
     """Manhattan distance heuristic"""
     return abs(cell[0] - goal[0]) + abs(cell[1] - goal[1])
 
-def astar_straight_preference(maze, start, goal, turn_penalty=0.001):
+class TurnCountCost:
+    """Fewest steps first, then fewest turns, as an exact integer (steps, turns) tuple"""
+    zero = (0, 0)
+
+    def step(self, cost, heading, direction):
+        """Cost after one more cell in direction, having arrived with heading (None at the start)"""
+        if heading is not None and direction != heading:
+            return (cost[0] + 1, cost[1] + 1)
+        return (cost[0] + 1, cost[1])
+
+    def add(self, cost1, cost2):
+        return (cost1[0] + cost2[0], cost1[1] + cost2[1])
+
+    def estimate(self, steps):
+        """Lower bound on the cost of a route that needs at least this many steps"""
+        return (steps, 0)
+
+    def rotate(self, cost, quarters):
+        """Cost after yawing in place by quarters quarter turns, counted as turns"""
+        return (cost[0], cost[1] + quarters)
+
+    def path_cost(self, path):
+        return (len(path) - 1, count_turns(path))
+
+class FlightTimeCost:
+    """
+    Estimated milliseconds in the air, as exact integers like TurnCountCost so
+    equally fast routes compare equal instead of by float rounding. Every
+    straight leg costs Utils.leg_time(length), the same sleep formula
+    Drone.move_to_block() uses, so each cell adds SLEEP_INCREMENT_VALUE and
+    each new leg SLEEP_BASE_VALUE; each quarter turn adds TURN_TIME_PER_QUARTER.
+    """
+    zero = 0
+
+    def __init__(self):
+        self.base = to_milliseconds(Utils.SLEEP_BASE_VALUE)
+        self.increment = to_milliseconds(Utils.SLEEP_INCREMENT_VALUE)
+        self.turn = to_milliseconds(Utils.TURN_TIME_PER_QUARTER)
+
+    def step(self, cost, heading, direction):
+        cost += self.increment
+        if direction != heading:
+            cost += self.base
+        return cost
+
+    def add(self, cost1, cost2):
+        return cost1 + cost2
+
+    def estimate(self, steps):
+        return steps * self.increment
+
+    def rotate(self, cost, quarters):
+        return cost + quarters * self.turn
+
+    def path_cost(self, path):
+        waypoints = Utils.optimized_path(path)
+        cost = 0
+        for i in range(len(waypoints) - 1):
+            cost += self.base + Utils.length(waypoints[i], waypoints[i + 1]) * self.increment
+        return cost
+
+def to_milliseconds(seconds):
+    return round(seconds * 1000)
+
+TURN_COUNT_COST = TurnCountCost()
+
+class DistanceField:
+    """
+    Exact step counts from every cell to one goal, computed with a single BFS
+    over the maze's wall bitmask array. Used as a perfect A* heuristic in place
+    of heuristic() when planning to the same goal repeatedly, and for bulk
+    "distance from every cell to the goal" queries.
+
+    The field is a snapshot: compute a new one after adding walls to the maze.
+    """
+    def __init__(self, maze, goal):
+        self.goal = goal
+        self.width = maze.width
+        self.height = maze.height
+
+        width = maze.width
+        size = maze.width * maze.height
+        walls = maze.cells
+        distances = array('i', [UNREACHABLE]) * size
+
+        if maze.in_bounds(goal):
+            goal_index = goal[1] * width + goal[0]
+            distances[goal_index] = 0
+            frontier = [goal_index]
+            distance = 0
+            while frontier:
+                distance += 1
+                next_frontier = []
+                for index in frontier:
+                    bits = walls[index]
+                    x = index % width
+                    for neighbor, is_open in ((index + width, index + width < size and not bits & NORTH),
+                                              (index + 1, x + 1 < width and not bits & EAST),
+                                              (index - width, index >= width and not bits & SOUTH),
+                                              (index - 1, x > 0 and not bits & WEST)):
+                        if is_open and distances[neighbor] == UNREACHABLE:
+                            distances[neighbor] = distance
+                            next_frontier.append(neighbor)
+                frontier = next_frontier
+
+        # Flat array indexed by y * width + x, UNREACHABLE where no path exists
+        self.distances = distances
+
+    def distance(self, cell):
+        """Steps from cell to the goal, or None if the goal cannot be reached"""
+        if not (0 <= cell[0] < self.width and 0 <= cell[1] < self.height):
+            return None
+        distance = self.distances[cell[1] * self.width + cell[0]]
+        if distance == UNREACHABLE:
+            return None
+        return distance
+
+    def grid(self):
+        """Distances as rows of cells, grid[y][x], with None for unreachable cells"""
+        return [[self.distance((x, y)) for x in range(self.width)] for y in range(self.height)]
+
+def distance_field(maze, goal):
+    """Distances from every cell of the maze to goal, see DistanceField"""
+    return DistanceField(maze, goal)
+
+def astar_straight_preference(maze, start, goal, turn_penalty=0.001, exact=False, cost_model=None, distances=None):
     """
     A* pathfinding with preference for straight paths.
     Adds a small penalty for direction changes to favor straighter routes.
@@ -20,10 +174,22 @@ def astar_straight_preference(maze, start, goal, turn_penalty=0.001):
         goal: (x, y) goal position
         turn_penalty: small penalty (e.g., 0.001) for changing direction
                      Should be much smaller than 1 to not affect optimality
+        exact: search (cell, heading) states with an integer (steps, turns)
+               cost instead (see astar_heading_state()), ignoring turn_penalty
+        cost_model: optimize this cost model over (cell, heading) states
+                    instead, e.g. FlightTimeCost(); implies exact
+        distances: DistanceField of goal, used as an exact heuristic
+                   instead of the Manhattan distance
 
     Returns:
         list of (x, y) cells from start to goal, or None if no path exists
     """
+    if exact or cost_model is not None:
+        return astar_heading_state(maze, start, goal, cost_model, distances)
+
+    if distances is not None and distances.goal != goal:
+        raise ValueError(f"Distance field is for goal {distances.goal}, not {goal}")
+
     counter = 0
     # Store (f_score, counter, cell, previous_direction)
     open_set = [(0, counter, start, None)]
@@ -37,12 +203,15 @@ def astar_straight_preference(maze, start, goal, turn_penalty=0.001):
     direction_from = {start: None}
 
     open_set_hash = {start}
+    expanded = 0
 
     while open_set:
         _, _, current, prev_direction = heapq.heappop(open_set)
         open_set_hash.discard(current)
+        expanded += 1
 
         if current == goal:
+            _count_expansions(expanded)
             reconstructed_path = reconstruct_path(came_from, current)
             LOG(f"Path found: {reconstructed_path}")
             LOG(f"Length: {len(reconstructed_path) - 1} steps")
@@ -64,16 +233,101 @@ def astar_straight_preference(maze, start, goal, turn_penalty=0.001):
             tentative_g = g_score[current] + move_cost
 
             if neighbor not in g_score or tentative_g < g_score[neighbor]:
+                if distances is None:
+                    estimate = heuristic(neighbor, goal)
+                else:
+                    estimate = distances.distance(neighbor)
+                    if estimate is None:
+                        continue
+
                 came_from[neighbor] = current
                 direction_from[neighbor] = current_direction
                 g_score[neighbor] = tentative_g
-                f_score[neighbor] = tentative_g + heuristic(neighbor, goal)
+                f_score[neighbor] = tentative_g + estimate
 
                 if neighbor not in open_set_hash:
                     heapq.heappush(open_set, (f_score[neighbor], counter, neighbor, current_direction))
                     counter += 1
                     open_set_hash.add(neighbor)
 
+    _count_expansions(expanded)
+    print("No path exists")
+    return None
+
+def astar_heading_state(maze, start, goal, cost_model=None, distances=None):
+    """
+    A* over (cell, heading) states with an exact cost from a cost model.
+    With the default TurnCountCost the cost is an integer (steps, turns)
+    tuple compared lexicographically, so this returns a shortest path and,
+    among shortest paths, one with the fewest turns. Unlike the turn penalty
+    in astar_straight_preference(), the turn cost depends on the heading a
+    cell is entered with, so no cheaper turn sequence is lost.
+
+    Args:
+        maze: Maze object
+        start: (x, y) starting position
+        goal: (x, y) goal position
+        cost_model: TurnCountCost (default) or FlightTimeCost
+        distances: DistanceField of goal, used as an exact heuristic
+                   instead of the Manhattan distance
+
+    Returns:
+        list of (x, y) cells from start to goal, or None if no path exists
+    """
+    if cost_model is None:
+        cost_model = TURN_COUNT_COST
+    if distances is not None and distances.goal != goal:
+        raise ValueError(f"Distance field is for goal {distances.goal}, not {goal}")
+
+    counter = 0
+    start_state = (start, None)
+    # Store (f_score, counter, state), where state is (cell, heading)
+    open_set = [(cost_model.add(cost_model.zero, cost_model.estimate(heuristic(start, goal))), counter, start_state)]
+    counter += 1
+
+    came_from = {}
+    g_score = {start_state: cost_model.zero}
+    closed = set()
+
+    while open_set:
+        _, _, state = heapq.heappop(open_set)
+        if state in closed:
+            continue
+        closed.add(state)
+
+        current, heading = state
+        if current == goal:
+            _count_expansions(len(closed))
+            reconstructed_path = reconstruct_path(came_from, state)
+            reconstructed_path = [cell for cell, _ in reconstructed_path]
+            LOG(f"Path found: {reconstructed_path}")
+            LOG(f"Length: {len(reconstructed_path) - 1} steps")
+            return reconstructed_path
+
+        cost = g_score[state]
+        for neighbor in maze.get_neighbors(current):
+            direction = (neighbor[0] - current[0], neighbor[1] - current[1])
+            neighbor_state = (neighbor, direction)
+            if neighbor_state in closed:
+                continue
+
+            tentative_g = cost_model.step(cost, heading, direction)
+
+            if neighbor_state not in g_score or tentative_g < g_score[neighbor_state]:
+                if distances is None:
+                    estimate = heuristic(neighbor, goal)
+                else:
+                    estimate = distances.distance(neighbor)
+                    if estimate is None:
+                        continue
+
+                came_from[neighbor_state] = state
+                g_score[neighbor_state] = tentative_g
+                f_score = cost_model.add(tentative_g, cost_model.estimate(estimate))
+                heapq.heappush(open_set, (f_score, counter, neighbor_state))
+                counter += 1
+
+    _count_expansions(len(closed))
     print("No path exists")
     return None
 
@@ -85,6 +339,157 @@ def reconstruct_path(came_from, current):
         path.append(current)
     return path[::-1]
 
+class IncrementalPlanner:
+    """
+    D* Lite planner that keeps its search state between wall updates.
+
+    The search runs backward from the goal, so when the drone moves or a wall
+    is discovered only the affected part of the search is repaired instead of
+    rerunning A* from scratch. Cells the drone has not scanned yet are assumed
+    open, which makes it usable both while discovering a maze and for
+    correcting a race path mid-flight (see fly_race_path()).
+
+    Usage:
+        planner = IncrementalPlanner(maze, start, goal)
+        path = planner.plan()
+        ...
+        planner.update_start(current_cell)
+        planner.add_wall(cell1, cell2)
+        path = planner.plan()
+    """
+    def __init__(self, maze, start, goal):
+        self.maze = maze
+        self.start = start
+        self.goal = goal
+        self.expansions = 0
+
+        self.km = 0
+        self.last_start = start
+        self.g = {}
+        self.rhs = {goal: 0}
+
+        # Heap of (key, counter, cell); entries whose key no longer matches
+        # open_keys[cell] are stale and skipped
+        self.open_set = []
+        self.open_keys = {}
+        self.counter = 0
+        self._push(goal)
+
+    def _key(self, cell):
+        value = min(self.g.get(cell, INFINITY), self.rhs.get(cell, INFINITY))
+        return (value + heuristic(self.start, cell) + self.km, value)
+
+    def _push(self, cell):
+        key = self._key(cell)
+        self.open_keys[cell] = key
+        heapq.heappush(self.open_set, (key, self.counter, cell))
+        self.counter += 1
+
+    def _top(self):
+        while self.open_set:
+            key, _, cell = self.open_set[0]
+            if self.open_keys.get(cell) == key:
+                return key, cell
+            heapq.heappop(self.open_set)
+        return None
+
+    def _update_vertex(self, cell):
+        if cell != self.goal:
+            best = INFINITY
+            for neighbor in self.maze.get_neighbors(cell):
+                cost = self.g.get(neighbor, INFINITY) + 1
+                if cost < best:
+                    best = cost
+            self.rhs[cell] = best
+
+        self.open_keys.pop(cell, None)
+        if self.g.get(cell, INFINITY) != self.rhs.get(cell, INFINITY):
+            self._push(cell)
+
+    def _compute_shortest_path(self):
+        while True:
+            top = self._top()
+            if top is None:
+                break
+
+            key, cell = top
+            start_g = self.g.get(self.start, INFINITY)
+            if not (key < self._key(self.start) or self.rhs.get(self.start, INFINITY) != start_g):
+                break
+
+            heapq.heappop(self.open_set)
+            del self.open_keys[cell]
+            self.expansions += 1
+
+            new_key = self._key(cell)
+            if key < new_key:
+                self._push(cell)
+            elif self.g.get(cell, INFINITY) > self.rhs.get(cell, INFINITY):
+                self.g[cell] = self.rhs[cell]
+                for neighbor in self.maze.get_neighbors(cell):
+                    self._update_vertex(neighbor)
+            else:
+                self.g[cell] = INFINITY
+                self._update_vertex(cell)
+                for neighbor in self.maze.get_neighbors(cell):
+                    self._update_vertex(neighbor)
+
+    def update_start(self, cell):
+        """Record that the drone has moved to cell"""
+        self.start = cell
+
+    def add_wall(self, cell1, cell2):
+        """Add a newly discovered wall to the maze and repair the search around it"""
+        self.maze.add_wall(cell1, cell2)
+        self.walls_changed([(cell1, cell2)])
+
+    def walls_changed(self, walls):
+        """Repair the search after walls were added to the maze, given as (cell1, cell2) pairs"""
+        self.km += heuristic(self.last_start, self.start)
+        self.last_start = self.start
+        for cell1, cell2 in walls:
+            for cell in (cell1, cell2):
+                if self.maze.in_bounds(cell):
+                    self._update_vertex(cell)
+
+    def plan(self):
+        """
+        Bring the search up to date and walk it from the current start.
+        Among equally short next steps, keeps flying in the same direction.
+
+        Returns:
+            list of (x, y) cells from start to goal, or None if no path exists
+        """
+        self._compute_shortest_path()
+        if self.g.get(self.start, INFINITY) == INFINITY:
+            print("No path exists")
+            return None
+
+        path = [self.start]
+        current = self.start
+        heading = None
+        while current != self.goal:
+            best = None
+            best_cost = None
+            for neighbor in self.maze.get_neighbors(current):
+                direction = (neighbor[0] - current[0], neighbor[1] - current[1])
+                cost = (self.g.get(neighbor, INFINITY) + 1, 0 if direction == heading else 1)
+                if best_cost is None or cost < best_cost:
+                    best = neighbor
+                    best_cost = cost
+
+            if best is None or best_cost[0] == INFINITY or len(path) > self.maze.width * self.maze.height:
+                print("No path exists")
+                return None
+
+            heading = (best[0] - current[0], best[1] - current[1])
+            path.append(best)
+            current = best
+
+        LOG(f"Path found: {path}")
+        LOG(f"Length: {len(path) - 1} steps")
+        return path
+
 direction_map = {
     'forward': (0, 1),
     'back': (0, -1),
@@ -92,7 +497,101 @@ direction_map = {
     'right': (1, 0)
 }
 
-def discover_maze(maze, start, drone):
+def scan_walls(maze, cell, drone):
+    """Scan current cell and add walls to maze, returning the walled-off neighbor cells"""
+    x, y = cell
+    barriers = drone.get_barriers()
+
+    walls = []
+    for direction in barriers:
+        dx, dy = direction_map[direction]
+        neighbor = (x + dx, y + dy)
+        if 0 <= neighbor[0] < maze.width and 0 <= neighbor[1] < maze.height:
+            maze.add_wall(cell, neighbor)
+            walls.append(neighbor)
+    return walls
+
+def fly_route(route, drone):
+    """Fly a cell route as collapsed straight legs, one move_to_block() per leg"""
+    waypoints = Utils.optimized_path(route)
+    for x, y in waypoints[1:]:
+        drone.move_to_block(x, y)
+
+def fly_race_path(maze, waypoints, drone):
+    """
+    Fly a planned race route, correcting it in flight if the maze turns out to
+    be wrong. The waypoints are flown as planned, unless the drone is not at
+    the first one, e.g. after an earlier route was cut off, and the drone is
+    then located from telemetry (see Drone.locate_block()). When it is in
+    another block than the goal, the walls of that block are scanned into an
+    IncrementalPlanner, which repairs only the affected part of its search,
+    and the repaired route is flown one leg at a time, locating the drone
+    after each leg. Walls are only scanned where two readings in a row
+    located the drone, and correction gives up after RACE_CORRECTION_ROUNDS
+    rounds.
+
+    Args:
+        maze: Maze the route was planned on; discovered walls are added to it
+        waypoints: collapsed route, e.g. Utils.optimized_path(path)
+        drone: Drone object
+
+    Returns:
+        True once the drone is located at the last waypoint, False if the
+        walls found on the way cut it off or correcting did not get it there
+    """
+    goal = tuple(waypoints[-1])
+    if drone.tracked_block() == tuple(waypoints[0]):
+        drone.traverse_path(waypoints)
+    current = locate_in_maze(maze, drone)
+
+    planner = None
+    for _ in range(RACE_CORRECTION_ROUNDS):
+        if current == goal:
+            return True
+        if current is None:
+            print(f"fly_race_path()::: position unclear, locating the drone again")
+            current = locate_in_maze(maze, drone)
+            continue
+
+        # Only scan where a second reading agrees, so one noisy reading cannot put walls in the wrong block
+        confirmed = locate_in_maze(maze, drone)
+        if confirmed != current:
+            current = confirmed
+            continue
+
+        print(f"fly_race_path()::: at {current} instead of {goal}, replanning")
+        walls = scan_walls(maze, current, drone)
+        if planner is None:
+            planner = IncrementalPlanner(maze, current, goal)
+        planner.update_start(current)
+        planner.walls_changed([(current, neighbor) for neighbor in walls])
+        route = planner.plan()
+        if route is None:
+            return False
+
+        for leg in drone.plan_legs(Utils.optimized_path(route)):
+            drone.fly_legs([leg])
+            current = locate_in_maze(maze, drone)
+            if current != leg.block:
+                break
+
+    if current == goal:
+        return True
+    print(f"fly_race_path()::: gave up on reaching {goal} after {RACE_CORRECTION_ROUNDS} corrections")
+    return False
+
+def locate_in_maze(maze, drone):
+    """Drone.locate_block() moved inside the maze, or None when the drone's block is unsure"""
+    block = drone.locate_block()
+    if block is None:
+        return None
+    return clamp_to_maze(maze, block)
+
+def clamp_to_maze(maze, cell):
+    """cell moved inside the maze, for telemetry blocks read past its far edges"""
+    return (min(max(cell[0], 0), maze.width - 1), min(max(cell[1], 0), maze.height - 1))
+
+def discover_maze(maze, start, drone, strategy="dfs", log_file=None, shrink_to_fit=False, targets=None, resume=False):
     """
     Explore maze with drone using DFS to discover all walls.
     Drone physically moves through maze, scanning walls at each position.
@@ -101,25 +600,87 @@ def discover_maze(maze, start, drone):
         maze: Maze object (initially empty)
         start: (x, y) starting position
         drone: Drone object with move_to_block(x, y) and get_barriers() methods
+        strategy: "dfs" to visit and backtrack one cell at a time, or
+                  "frontier" to fly to the nearest unexplored cell in
+                  straight legs (see discover_maze_frontier())
+        log_file: DiscoveryLog file to stream progress to, replacing
+                  whatever it held unless resuming
+        shrink_to_fit: maze size is only a placeholder upper bound, e.g.
+                       Maze(100, 100); shrink it to the detected arena
+                       afterwards (see shrink_to_discovered_bounds())
+        targets: race goal cells; when given, discovery stops as soon as the
+                 fastest routes between start and every target are proven,
+                 leaving the rest of the maze unexplored and its unscanned
+                 sides walled off ("frontier" only, see TargetRoutes)
+        resume: continue the unfinished discovery in log_file, if it is for
+                the same maze size, start and strategy, trusting the walls
+                it recorded instead of scanning those cells again; only
+                safe when the arena has not changed since
 
     Returns:
         tuple: (path_taken, cells_explored)
             - path_taken: list of cells drone actually moved through
             - cells_explored: number of unique cells visited
     """
+    if targets is not None:
+        if strategy != "frontier":
+            raise ValueError("Goal-directed discovery needs the frontier strategy")
+        if shrink_to_fit:
+            raise ValueError("Cannot shrink to the arena bounds when discovery stops early")
 
-    print("discover_maze()::: Starting maze discovery...")
+    if strategy == "frontier":
+        path, cells_explored, visited = explore_frontier(maze, start, drone, log_file=log_file, targets=targets,
+                                                         resume=resume)
+    elif strategy == "dfs":
+        path, cells_explored, visited = explore_dfs(maze, start, drone, log_file, resume)
+    else:
+        raise ValueError(f"Unknown discovery strategy: {strategy}")
 
-    def scan_walls(cell):
-        """Scan current cell and add walls to maze"""
-        x, y = cell
-        barriers = drone.get_barriers()
+    if shrink_to_fit:
+        shrink_to_discovered_bounds(maze, visited)
 
-        for direction in barriers:
-            dx, dy = direction_map[direction]
-            neighbor = (x + dx, y + dy)
-            if 0 <= neighbor[0] < maze.width and 0 <= neighbor[1] < maze.height:
-                maze.add_wall(cell, neighbor)
+    return path, cells_explored
+
+def discover_maze_frontier(maze, start, drone, cost_model=None, log_file=None, targets=None, resume=False):
+    """
+    Explore maze with drone by repeatedly flying to the nearest unexplored
+    frontier cell (an unvisited cell next to a visited one, with no known
+    wall between them). Routes only cross visited cells, whose walls are
+    known, and are flown as collapsed straight legs, so backtracking costs
+    one move per straight leg instead of one move per cell.
+
+    Args:
+        maze: Maze object (initially empty)
+        start: (x, y) starting position
+        drone: Drone object with move_to_block(x, y) and get_barriers() methods
+        cost_model: how "nearest" is measured, FlightTimeCost by default
+        log_file: DiscoveryLog file to stream progress to
+        targets: race goal cells to stop early for (see discover_maze())
+        resume: continue the unfinished discovery in log_file (see discover_maze())
+
+    Returns:
+        tuple: (path_taken, cells_explored)
+            - path_taken: list of cells drone actually moved through
+            - cells_explored: number of unique cells visited
+    """
+    path, cells_explored, _ = explore_frontier(maze, start, drone, cost_model, log_file, targets, resume)
+    return path, cells_explored
+
+def shrink_to_discovered_bounds(maze, visited):
+    """
+    Shrink a placeholder-sized maze to the arena found by discovery. Discovery
+    cannot leave the arena, whose edges are walls, so the visited cells span
+    exactly the real extent measured from the (0, 0) origin.
+    """
+    width = max(cell[0] for cell in visited) + 1
+    height = max(cell[1] for cell in visited) + 1
+    if (width, height) != (maze.width, maze.height):
+        print(f"discover_maze()::: Detected arena bounds: {width}x{height} (was {maze.width}x{maze.height})")
+        maze.shrink_to(width, height)
+
+def explore_dfs(maze, start, drone, log_file=None, resume=False):
+    """DFS exploration behind discover_maze(), returning (path_taken, cells_explored, visited)"""
+    print("discover_maze()::: Starting maze discovery...")
 
     def get_unvisited_neighbors(cell, visited):
         """Get passable neighbors that haven't been visited"""
@@ -136,13 +697,17 @@ def discover_maze(maze, start, drone):
 
     # DFS exploration
     visited = set()
-    stack = [start]
-    path = [start]
+    stack = []
+    known = KnownSides(maze)
+    log = None if log_file is None else DiscoveryLog(log_file)
+    explorer = Explorer(maze, start, drone, known, visited, log=log)
 
-    # Move drone to start and scan
+    # Move drone to start and scan, unless resuming
     drone.move_to_block(start[0], start[1])
-    visited.add(start)
-    scan_walls(start)
+    if not resume_discovery(log, maze, start, "dfs", known, visited, stack, resume):
+        stack.append(start)
+        visited.add(start)
+        explorer.visit(start, [start])
 
     while stack:
         current = stack[-1]
@@ -155,27 +720,367 @@ def discover_maze(maze, start, drone):
             next_cell = neighbors[0]
             stack.append(next_cell)
 
-            # Physically move drone
-            drone.move_to_block(next_cell[0], next_cell[1])
-            path.append(next_cell)
-
-            # Mark as visited and scan
+            # Mark as visited, flying there only if a scan can still teach us something
             visited.add(next_cell)
-            scan_walls(next_cell)
+            explorer.visit(next_cell)
         else:
-            # No unvisited neighbors, backtrack
+            # No unvisited neighbors, backtrack. The drone only flies back
+            # when the next cell it has to scan needs it to.
             stack.pop()
-            if stack:
-                backtrack_cell = stack[-1]
-                drone.move_to_block(backtrack_cell[0], backtrack_cell[1])
-                path.append(backtrack_cell)
+            explorer.backtrack()
+
+    explorer.finish()
+    print_discovery_summary(maze, explorer.path, visited, explorer.scans_skipped)
+    return explorer.path, len(visited), visited
+
+def explore_frontier(maze, start, drone, cost_model=None, log_file=None, targets=None, resume=False):
+    """Frontier exploration behind discover_maze_frontier(), returning (path_taken, cells_explored, visited)"""
+    if cost_model is None:
+        cost_model = FlightTimeCost()
+
+    print("discover_maze()::: Starting frontier maze discovery...")
+
+    visited = set()
+    known = KnownSides(maze)
+    log = None if log_file is None else DiscoveryLog(log_file)
+    explorer = Explorer(maze, start, drone, known, visited, cost_model, log)
+
+    # Move drone to start and scan, unless resuming
+    drone.move_to_block(start[0], start[1])
+    if not resume_discovery(log, maze, start, "frontier", known, visited, resume=resume):
+        visited.add(start)
+        explorer.visit(start, [start])
 
+    target_routes = None
+    if targets is not None:
+        waypoints = [start] + [tuple(target) for target in targets if tuple(target) != start]
+        target_routes = TargetRoutes(maze, known, waypoints, cost_model)
+    is_relevant = None
+    while True:
+        if target_routes is not None:
+            if target_routes.update():
+                print("discover_maze()::: Fastest routes to all targets are known, stopping early")
+                close_unknown_sides(maze, known)
+                break
+            is_relevant = target_routes.is_relevant
+
+        route = route_through_visited(maze, explorer.position, visited, cost_model=cost_model, is_frontier=is_relevant)
+        if route is None and is_relevant is not None:
+            # No frontier cell borders an unproven route; explore anywhere
+            route = route_through_visited(maze, explorer.position, visited, cost_model=cost_model)
+        if route is None:
+            break
+
+        frontier_cell = route[-1]
+        visited.add(frontier_cell)
+        explorer.visit(frontier_cell, route)
+
+    explorer.finish()
+    print_discovery_summary(maze, explorer.path, visited, explorer.scans_skipped)
+    return explorer.path, len(visited), visited
+
+def close_unknown_sides(maze, known):
+    """Wall off every side discovery never scanned, so routes planned on the
+    partially explored maze only cross sides known to be open"""
+    for index, bits in enumerate(known.known):
+        if bits == ALL_SIDES:
+            continue
+        cell = (index % maze.width, index // maze.width)
+        for dx, dy, bit in MAZE_DIRECTIONS:
+            if not bits & bit:
+                maze.add_wall(cell, (cell[0] + dx, cell[1] + dy))
+
+class TargetRoutes:
+    """
+    Proof that goal-directed discovery has found the fastest routes between
+    every pair of waypoints (start and targets), under the cost model races
+    plan with.
+
+    Each pair keeps its cheapest route through the maze as discovered so far,
+    where unknown sides are open as the maze stores them, so its cost is a
+    lower bound on the true cost; among equally cheap routes the one crossing
+    the fewest unknown sides is kept. Once a pair's route crosses no unknown
+    side, no later scan can beat it and walling off every unknown side keeps
+    it, so the pair is proven for good. A route is only searched again when a
+    newly discovered wall cuts it.
+    """
+    def __init__(self, maze, known, waypoints, cost_model):
+        self.maze = maze
+        self.known = known
+        self.cost_model = cost_model
+        self.routes = {}
+        for i, a in enumerate(waypoints):
+            for b in waypoints[i + 1:]:
+                self.routes[(a, b)] = self._search(a, b)
+        # Cells next to an unknown side of an unproven route, where scanning can settle it
+        self.frontier = set()
+
+    def update(self):
+        """Catch up with the walls and sides found since the last call; True once every pair is proven"""
+        self.frontier = set()
+        for pair in list(self.routes):
+            route = self.routes[pair]
+            if route is not None and any(not self.maze.is_passable(route[i], route[i + 1]) for i in range(len(route) - 1)):
+                route = self.routes[pair] = self._search(*pair)
+
+            unknown = [] if route is None else self._unknown_sides(route)
+            if unknown:
+                for side in unknown:
+                    self.frontier.update(side)
+            else:
+                # Proven, or unreachable even through unknown sides: nothing left to learn
+                del self.routes[pair]
+        return not self.routes
+
+    def is_relevant(self, cell):
+        return cell in self.frontier
+
+    def _unknown_sides(self, route):
+        width = self.maze.width
+        sides = []
+        for i in range(len(route) - 1):
+            cell = route[i]
+            bit = MAZE_DIRECTION_BITS[(route[i + 1][0] - cell[0], route[i + 1][1] - cell[1])]
+            if not self.known.known[cell[1] * width + cell[0]] & bit:
+                sides.append((cell, route[i + 1]))
+        return sides
+
+    def _search(self, start, goal):
+        """A* over (cell, heading) states for the cheapest route, then the fewest unknown sides crossed"""
+        cost_model = self.cost_model
+        known = self.known.known
+        walls = self.maze.cells
+        width = self.maze.width
+        size = width * self.maze.height
+
+        # Exact step counts to the goal make a much tighter heuristic than Manhattan distance
+        distances = DistanceField(self.maze, goal).distances
+        start_index = start[1] * width + start[0]
+        if distances[start_index] == UNREACHABLE:
+            return None
+        estimates = {}
+
+        def estimate(index):
+            if index not in estimates:
+                estimates[index] = cost_model.estimate(distances[index])
+            return estimates[index]
+
+        goal_index = goal[1] * width + goal[0]
+        counter = 0
+        start_state = (start_index, None)
+        open_set = [((estimate(start_index), 0), counter, start_state)]
+        counter += 1
+        came_from = {}
+        g_score = {start_state: (cost_model.zero, 0)}
+        closed = set()
+
+        while open_set:
+            _, _, state = heapq.heappop(open_set)
+            if state in closed:
+                continue
+            closed.add(state)
+
+            index, heading = state
+            if index == goal_index:
+                return [(i % width, i // width) for i, _ in reconstruct_path(came_from, state)]
+
+            cost, unknown = g_score[state]
+            bits = walls[index]
+            unknown_bits = ~known[index]
+            x = index % width
+            for neighbor, direction, bit, is_inside in ((index + width, (0, 1), NORTH, index + width < size),
+                                                        (index + 1, (1, 0), EAST, x + 1 < width),
+                                                        (index - width, (0, -1), SOUTH, index >= width),
+                                                        (index - 1, (-1, 0), WEST, x > 0)):
+                if not is_inside or bits & bit:
+                    continue
+                neighbor_state = (neighbor, direction)
+                if neighbor_state in closed:
+                    continue
+
+                tentative_g = (cost_model.step(cost, heading, direction), unknown + bool(unknown_bits & bit))
+                if neighbor_state not in g_score or tentative_g < g_score[neighbor_state]:
+                    came_from[neighbor_state] = state
+                    g_score[neighbor_state] = tentative_g
+                    f_score = (cost_model.add(tentative_g[0], estimate(neighbor)), tentative_g[1])
+                    heapq.heappush(open_set, (f_score, counter, neighbor_state))
+                    counter += 1
+
+        return None
+
+class KnownSides:
+    """
+    Which sides of each cell are known during discovery, as N/E/S/W bits.
+    A side is known once either cell next to it has been scanned, or when it
+    lies on the maze boundary. A cell whose four sides are known has nothing
+    left to scan.
+    """
+    def __init__(self, maze):
+        self.maze = maze
+        self.known = bytearray(maze.width * maze.height)
+
+        width = maze.width
+        for x in range(width):
+            self.known[x] |= SOUTH
+            self.known[(maze.height - 1) * width + x] |= NORTH
+        for y in range(maze.height):
+            self.known[y * width] |= WEST
+            self.known[y * width + width - 1] |= EAST
+
+    def mark_scanned(self, cell):
+        x, y = cell
+        self.known[y * self.maze.width + x] = ALL_SIDES
+        for dx, dy, bit in MAZE_DIRECTIONS:
+            neighbor = (x + dx, y + dy)
+            if self.maze.in_bounds(neighbor):
+                self.known[neighbor[1] * self.maze.width + neighbor[0]] |= OPPOSITE_BITS[bit]
+
+    def is_fully_known(self, cell):
+        return self.known[cell[1] * self.maze.width + cell[0]] == ALL_SIDES
+
+def resume_discovery(log, maze, start, strategy, known, visited, stack=None, resume=True):
+    """
+    Replay an unfinished DiscoveryLog into the maze, known sides, visited
+    cells and (for DFS) the stack, then keep appending to it. Starts a new
+    log instead when there is nothing to resume or resume is False.
+
+    Returns:
+        True if discovery was resumed, False if it starts from scratch
+    """
+    if log is None:
+        return False
+
+    records = log.read_resumable(maze, start, strategy) if resume else None
+    if not records:
+        log.begin(maze, start, strategy)
+        return False
+
+    for record in records:
+        if record['event'] == 'visit':
+            cell = tuple(record['cell'])
+            visited.add(cell)
+            if stack is not None:
+                stack.append(cell)
+            if record['walls'] is not None:
+                for neighbor in record['walls']:
+                    maze.add_wall(cell, tuple(neighbor))
+                known.mark_scanned(cell)
+        elif record['event'] == 'backtrack' and stack:
+            stack.pop()
+
+    log.resume()
+    print(f"discover_maze()::: Resuming from {log.filename}: {len(visited)} cells already explored")
+    return True
+
+class Explorer:
+    """
+    Drone side of discovery: scans cells, skips scans of cells whose walls are
+    already fully known, and only flies when a scan is needed. Flights take the
+    cheapest route through visited cells as collapsed straight legs. Every
+    visit is streamed to the DiscoveryLog, if one is given.
+    """
+    def __init__(self, maze, start, drone, known, visited, cost_model=None, log=None):
+        self.maze = maze
+        self.drone = drone
+        self.known = known
+        self.visited = visited
+        self.cost_model = cost_model
+        self.log = log
+
+        self.position = start
+        self.path = [start]
+        self.scans_skipped = 0
+
+    def scan(self, cell):
+        walls = scan_walls(self.maze, cell, self.drone)
+        self.known.mark_scanned(cell)
+        return walls
+
+    def visit(self, cell, route=None):
+        """Scan a newly visited cell, unless its walls are already fully known"""
+        if self.known.is_fully_known(cell):
+            LOG(f"discover_maze()::: walls of {cell} already known, skipping scan")
+            self.scans_skipped += 1
+            if self.log is not None:
+                self.log.record_visit(cell, None)
+            return
+
+        if route is None:
+            route = route_through_visited(self.maze, self.position, self.visited, cell, self.cost_model)
+        fly_route(route, self.drone)
+        self.path.extend(route[1:])
+        self.position = cell
+        walls = self.scan(cell)
+        if self.log is not None:
+            self.log.record_visit(cell, walls)
+
+    def backtrack(self):
+        if self.log is not None:
+            self.log.record_backtrack()
+
+    def finish(self):
+        if self.log is not None:
+            self.log.finish()
+
+def route_through_visited(maze, start, visited, goal=None, cost_model=None, is_frontier=None):
+    """
+    Dijkstra over (cell, heading) states that only passes through visited
+    cells, whose walls are known. Stops at goal, or when goal is None at the
+    first unvisited cell reached: the cheapest frontier cell to fly to,
+    optionally only among cells accepted by is_frontier(cell). Among equally
+    cheap routes, the one with the fewest legs is returned.
+
+    Returns:
+        list of (x, y) cells from start to the goal or frontier cell, or None
+        when it cannot be reached (every reachable cell visited, if no goal)
+    """
+    if cost_model is None:
+        cost_model = TURN_COUNT_COST
+
+    counter = 0
+    start_state = (start, None)
+    open_set = [(cost_model.zero, counter, start_state)]
+    counter += 1
+
+    came_from = {}
+    g_score = {start_state: cost_model.zero}
+    closed = set()
+
+    while open_set:
+        cost, _, state = heapq.heappop(open_set)
+        if state in closed:
+            continue
+        closed.add(state)
+
+        current, heading = state
+        if current == goal or (goal is None and current not in visited and
+                               (is_frontier is None or is_frontier(current))):
+            return [cell for cell, _ in reconstruct_path(came_from, state)]
+        if current not in visited:
+            continue
+
+        for neighbor in maze.get_neighbors(current):
+            direction = (neighbor[0] - current[0], neighbor[1] - current[1])
+            neighbor_state = (neighbor, direction)
+            if neighbor_state in closed:
+                continue
+
+            tentative_g = cost_model.step(cost, heading, direction)
+            if neighbor_state not in g_score or tentative_g < g_score[neighbor_state]:
+                came_from[neighbor_state] = state
+                g_score[neighbor_state] = tentative_g
+                heapq.heappush(open_set, (tentative_g, counter, neighbor_state))
+                counter += 1
+
+    return None
+
+def print_discovery_summary(maze, path, visited, scans_skipped=0):
     print(f"\ndiscover_maze()::: Exploration complete!")
     print(f"discover_maze()::: Cells explored: {len(visited)}")
     print(f"discover_maze()::: Path length (including backtracking): {len(path)}")
-    print(f"discover_maze()::: Walls discovered: {len(maze.walls)}")
+    print(f"discover_maze()::: Scans skipped (walls already known): {scans_skipped}")
+    print(f"discover_maze()::: Walls discovered: {maze.wall_count}")
     print(f"\ndiscover_maze()::: Maze ready for pathfinding!")
-    return path, len(visited)
 
 def count_turns(path):
     """Count number of direction changes in a path"""
@@ -198,15 +1103,397 @@ def count_turns(path):
 
     return turns
 
-def astar_multi_goal_straight_preference(maze, start, goals):
+def rotation_quarters(from_bearing, to_bearing):
+    """Quarter turns needed to yaw from one bearing to another, 0-2"""
+    difference = (Utils.BEARINGS.index(to_bearing) - Utils.BEARINGS.index(from_bearing)) % 4
+    return min(difference, 4 - difference)
+
+def direction_orders(bearing, directions):
+    """
+    Cheapest order to face each of directions, starting from bearing, for
+    every bearing the drone can end up facing.
+
+    Returns:
+        dict mapping final bearing to (quarter turns, ordered directions);
+        {bearing: (0, [])} when there is nothing to face
     """
-    A* pathfinding to reach multiple goals (3-4) in optimal order.
+    from itertools import permutations
+
+    orders = {}
+    for order in permutations(dict.fromkeys(directions)):
+        quarters = 0
+        current = bearing
+        for direction in order:
+            quarters += rotation_quarters(current, direction)
+            current = direction
+        if current not in orders or quarters < orders[current][0]:
+            orders[current] = (quarters, list(order))
+    return orders
+
+def schedule_directions(bearing, directions):
+    """Order to face directions from bearing with the least total rotation,
+    instead of the input order, which can turn 180 degrees twice"""
+    return min(direction_orders(bearing, directions).values(), key=lambda entry: entry[0])[1]
+
+def detection_schedule(bearing, waypoints, detections):
+    """
+    Order of the detection directions at each waypoint that minimizes the
+    total rotation over the whole mission, when the waypoints are visited in
+    the given order starting with the drone facing bearing. Flights keep the
+    drone's yaw, so only detection turns rotate it.
+
+    Args:
+        bearing: drone bearing at the first waypoint
+        waypoints: cells in visiting order
+        detections: dict mapping cell to the directions to check there
+
+    Returns:
+        list with the ordered directions to check at each waypoint
+    """
+    # states[final bearing] = (quarter turns so far, order per waypoint so far)
+    states = {bearing: (0, [])}
+    for waypoint in waypoints:
+        next_states = {}
+        for current, (quarters, orders) in states.items():
+            for final, (turn, order) in direction_orders(current, detections.get(waypoint, [])).items():
+                if final not in next_states or quarters + turn < next_states[final][0]:
+                    next_states[final] = (quarters + turn, orders + [order])
+        states = next_states
+    return min(states.values(), key=lambda entry: entry[0])[1]
+
+def segment_matrix(maze, waypoints, exact=False, cost_model=None, graph=None, distance_fields=False):
+    """
+    Plan every ordered pair of waypoints once. Legs back to the first
+    waypoint (the start) are never flown, so they are not planned.
+
+    Args:
+        maze: Maze object
+        waypoints: list of (x, y) cells (start followed by the goals)
+        exact: plan legs with astar_heading_state() instead of the turn penalty
+        cost_model: plan and score legs with this cost model (implies exact);
+                    legs are scored as (length, turns) when None
+        graph: JunctionGraph of the maze to plan legs on (implies exact)
+        distance_fields: compute one DistanceField per goal and use it as the
+                         exact heuristic for every leg ending at that goal
+
+    Returns:
+        dict mapping (from_cell, to_cell) to (segment, cost), or to None
+        when no path exists between the two cells
+    """
+    scoring_model = TURN_COUNT_COST if cost_model is None else cost_model
+    matrix = {}
+    for to_cell in waypoints[1:]:
+        distances = None
+        if distance_fields and graph is None:
+            distances = distance_field(maze, to_cell)
+        for from_cell in waypoints:
+            if from_cell == to_cell or (from_cell, to_cell) in matrix:
+                continue
+            if distances is not None and distances.distance(from_cell) is None:
+                segment = None
+            elif graph is not None:
+                segment = graph.astar(from_cell, to_cell, cost_model)
+            else:
+                segment = astar_straight_preference(maze, from_cell, to_cell, exact=exact, cost_model=cost_model,
+                                                    distances=distances)
+            if segment is None:
+                matrix[(from_cell, to_cell)] = None
+            else:
+                matrix[(from_cell, to_cell)] = (segment, scoring_model.path_cost(segment))
+    return matrix
+
+def leg_cost(matrix, from_cell, to_cell, cost_model=TURN_COUNT_COST):
+    """Cost of a cached leg, zero when staying put, None when unreachable"""
+    if from_cell == to_cell:
+        return cost_model.zero
+    entry = matrix[(from_cell, to_cell)]
+    if entry is None:
+        return None
+    return entry[1]
+
+def order_cost(matrix, waypoints, cost_model=TURN_COUNT_COST, detections=None, bearing=None):
+    """
+    Total cost of visiting waypoints in the given order, or None if a leg is
+    unreachable. With detections ({cell: directions}) the cheapest rotation
+    for facing every direction, starting from bearing, is added as well.
+    """
+    if detections is not None:
+        return _order_cost_with_rotation(matrix, waypoints, cost_model, detections, bearing)
+
+    total = cost_model.zero
+    for i in range(len(waypoints) - 1):
+        cost = leg_cost(matrix, waypoints[i], waypoints[i + 1], cost_model)
+        if cost is None:
+            return None
+        total = cost_model.add(total, cost)
+    return total
+
+def _order_cost_with_rotation(matrix, waypoints, cost_model, detections, bearing):
+    # costs[final bearing] = cheapest cost so far. Nothing is checked at the
+    # start itself; a start cell with detections is also one of the goals.
+    costs = {bearing: cost_model.zero}
+
+    for i in range(len(waypoints) - 1):
+        leg = leg_cost(matrix, waypoints[i], waypoints[i + 1], cost_model)
+        if leg is None:
+            return None
+        next_costs = {}
+        for current, cost in costs.items():
+            cost = cost_model.add(cost, leg)
+            for final, (quarters, _) in direction_orders(current, detections.get(waypoints[i + 1], [])).items():
+                rotated = cost_model.rotate(cost, quarters)
+                if final not in next_costs or rotated < next_costs[final]:
+                    next_costs[final] = rotated
+        costs = next_costs
+    return min(costs.values())
+
+def order_goals_permutations(start, goals, matrix, cost_model=TURN_COUNT_COST, detections=None, bearing=None):
+    """
+    Brute-force goal ordering: score every permutation of the goals.
+
+    Returns:
+        list of waypoints [start, goal1, goal2, ...] with the lowest
+        cost, or None if no ordering is reachable
+    """
+    from itertools import permutations
+
+    best_order = None
+    best_cost = None
+
+    # Try all orderings (3! = 6 or 4! = 24 permutations)
+    for perm in permutations(goals):
+        # Build path: start → goal1 → goal2 → goal3 → (goal4)
+        waypoints = [start] + list(perm)
+        cost = order_cost(matrix, waypoints, cost_model, detections, bearing)
+
+        # Prefer shorter paths, break ties with fewer turns
+        if cost is not None and (best_cost is None or cost < best_cost):
+            best_cost = cost
+            best_order = waypoints
+
+    return best_order
+
+def order_goals_held_karp(start, goals, matrix, cost_model=TURN_COUNT_COST, detections=None, bearing=None):
+    """
+    Exact goal ordering with Held-Karp dynamic programming over subsets of goals.
+    Runs in O(2^n * n^2) instead of O(n!), which keeps 8-12 goals practical.
+    With detections, the bearing the drone ends up facing at each goal is
+    part of the state (see _held_karp_with_rotation()).
+
+    Returns:
+        list of waypoints [start, goal1, goal2, ...] with the lowest
+        cost, or None if no ordering is reachable
+    """
+    if detections is not None:
+        return _held_karp_with_rotation(start, goals, matrix, cost_model, detections, bearing)
+
+    n = len(goals)
+    full_mask = (1 << n) - 1
+
+    # best[mask][j]: (cost, previous goal index) of the cheapest route from start
+    # that visits exactly the goals in mask and ends at goal j
+    best = [[None] * n for _ in range(1 << n)]
+    for j in range(n):
+        cost = leg_cost(matrix, start, goals[j], cost_model)
+        if cost is not None:
+            best[1 << j][j] = (cost, None)
+
+    for mask in range(1, full_mask + 1):
+        for j in range(n):
+            entry = best[mask][j]
+            if entry is None:
+                continue
+            cost = entry[0]
+            for k in range(n):
+                if mask & (1 << k):
+                    continue
+                step = leg_cost(matrix, goals[j], goals[k], cost_model)
+                if step is None:
+                    continue
+                new_cost = cost_model.add(cost, step)
+                next_mask = mask | (1 << k)
+                current = best[next_mask][k]
+                if current is None or new_cost < current[0]:
+                    best[next_mask][k] = (new_cost, j)
+
+    last = None
+    for j in range(n):
+        entry = best[full_mask][j]
+        if entry is not None and (last is None or entry[0] < best[full_mask][last][0]):
+            last = j
+
+    if last is None:
+        return None
+
+    order = []
+    mask = full_mask
+    while last is not None:
+        order.append(goals[last])
+        previous = best[mask][last][1]
+        mask &= ~(1 << last)
+        last = previous
+
+    return [start] + order[::-1]
+
+def _held_karp_with_rotation(start, goals, matrix, cost_model, detections, bearing):
+    """Held-Karp over (goals visited, last goal, final bearing) states, adding
+    the cheapest rotation through each goal's detection directions to its leg.
+    A goal with one direction to check has a single final bearing, so the
+    state space only grows at goals checked in several directions."""
+    n = len(goals)
+    full_mask = (1 << n) - 1
+
+    rotations = {}
+
+    def orders(current, cell):
+        key = (current, cell)
+        if key not in rotations:
+            rotations[key] = direction_orders(current, detections.get(cell, []))
+        return rotations[key]
+
+    def arrive(states, leg, cell, into, previous):
+        """Relax into[final bearing] with every way to check cell's directions"""
+        for current, entry in states.items():
+            arrived = cost_model.add(entry[0], leg)
+            for final, (quarters, _) in orders(current, cell).items():
+                cost = cost_model.rotate(arrived, quarters)
+                if final not in into or cost < into[final][0]:
+                    into[final] = (cost, previous, current)
+
+    start_states = {bearing: (cost_model.zero,)}
+
+    # best[mask][j][bearing]: (cost, previous goal index, bearing at the previous goal)
+    best = [[None] * n for _ in range(1 << n)]
+    for j in range(n):
+        leg = leg_cost(matrix, start, goals[j], cost_model)
+        if leg is not None:
+            best[1 << j][j] = {}
+            arrive(start_states, leg, goals[j], best[1 << j][j], None)
+
+    for mask in range(1, full_mask + 1):
+        for j in range(n):
+            states = best[mask][j]
+            if not states:
+                continue
+            for k in range(n):
+                if mask & (1 << k):
+                    continue
+                leg = leg_cost(matrix, goals[j], goals[k], cost_model)
+                if leg is None:
+                    continue
+                next_mask = mask | (1 << k)
+                if best[next_mask][k] is None:
+                    best[next_mask][k] = {}
+                arrive(states, leg, goals[k], best[next_mask][k], j)
+
+    last = None
+    for j in range(n):
+        for final, entry in (best[full_mask][j] or {}).items():
+            if last is None or entry[0] < best[full_mask][last[0]][last[1]][0]:
+                last = (j, final)
+
+    if last is None:
+        return None
+
+    order = []
+    mask = full_mask
+    j, final = last
+    while j is not None:
+        order.append(goals[j])
+        _, previous, previous_bearing = best[mask][j][final]
+        mask &= ~(1 << j)
+        j, final = previous, previous_bearing
+
+    return [start] + order[::-1]
+
+def order_goals_nearest_neighbor(start, goals, matrix, time_limit=HEURISTIC_TIME_LIMIT, cost_model=TURN_COUNT_COST,
+                                 detections=None, bearing=None):
+    """
+    Heuristic goal ordering: greedy nearest neighbor, improved with 2-opt
+    segment reversals until no move helps or time_limit seconds have passed.
+
+    Returns:
+        list of waypoints [start, goal1, goal2, ...], or None if the greedy
+        tour gets stuck on an unreachable goal
+    """
+    import time
+
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+    initial_bearing = bearing
+
+    order = [start]
+    remaining = list(goals)
+    while remaining:
+        nearest = None
+        nearest_cost = None
+        nearest_bearing = None
+        for goal in remaining:
+            cost = leg_cost(matrix, order[-1], goal, cost_model)
+            final = None
+            if cost is not None and detections is not None:
+                final, (quarters, _) = min(direction_orders(bearing, detections.get(goal, [])).items(),
+                                           key=lambda item: item[1][0])
+                cost = cost_model.rotate(cost, quarters)
+            if cost is not None and (nearest_cost is None or cost < nearest_cost):
+                nearest = goal
+                nearest_cost = cost
+                nearest_bearing = final
+        if nearest is None:
+            return None
+        order.append(nearest)
+        remaining.remove(nearest)
+        bearing = nearest_bearing
+
+    best_cost = order_cost(matrix, order, cost_model, detections, initial_bearing)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, len(order) - 1):
+            for k in range(i + 1, len(order)):
+                if deadline is not None and time.monotonic() > deadline:
+                    return order
+                candidate = order[:i] + order[i:k + 1][::-1] + order[k + 1:]
+                cost = order_cost(matrix, candidate, cost_model, detections, initial_bearing)
+                if cost is not None and cost < best_cost:
+                    order = candidate
+                    best_cost = cost
+                    improved = True
+
+    return order
+
+def astar_multi_goal_straight_preference(maze, start, goals, ordering="auto", time_limit=HEURISTIC_TIME_LIMIT, exact=False,
+                                         cost_model=None, graph=None, distance_fields=False, detections=None,
+                                         bearing="North"):
+    """
+    A* pathfinding to reach multiple goals in optimal order.
     Returns separate path segments for each leg of the journey.
 
+    Each start/goal pair is planned only once (see segment_matrix()), and
+    every ordering is scored from those cached segments by total length,
+    with fewer turns breaking ties, or by total cost_model cost when given.
+
     Args:
         maze: Maze object
         start: (x, y) starting position
-        goals: list of 3-4 (x, y) goal positions to visit (in any order)
+        goals: list of (x, y) goal positions to visit (in any order)
+        ordering: "permutations" (brute force), "held_karp" (exact dynamic
+                  programming), "heuristic" (nearest neighbor + 2-opt) or
+                  "auto" to pick by the number of goals
+        time_limit: seconds the 2-opt improvement of the heuristic may run,
+                    None for no limit
+        exact: plan each leg with the exact (steps, turns) search, see
+               astar_heading_state()
+        cost_model: plan and score legs with this cost model instead, e.g.
+                    FlightTimeCost() to minimize estimated mission time
+        graph: JunctionGraph.JunctionGraph of the maze; legs are then planned
+               on the contracted graph, which is much cheaper on large mazes
+        distance_fields: plan legs on the grid using one exact DistanceField
+                         heuristic per goal
+        detections: dict mapping goals to the directions the drone must
+                    face there; the cheapest yaw rotation through them is
+                    added to the cost of each ordering (see cost_model.rotate()
+                    and detection_schedule())
+        bearing: bearing the drone faces at start, used with detections
 
     Returns:
         list of path segments, where each segment is a list of (x, y) cells
@@ -217,43 +1504,42 @@ def astar_multi_goal_straight_preference(maze, start, goals):
         ]
         Returns None if no valid path exists
     """
-    from itertools import permutations
-
     if not goals:
         return [[start]]
 
-    best_segments = None
-    best_length = float('inf')
-    best_turns = float('inf')
-
-    # Try all orderings (3! = 6 or 4! = 24 permutations)
-    for perm in permutations(goals):
-        # Build path: start → goal1 → goal2 → goal3 → (goal4)
-        waypoints = [start] + list(perm)
-
-        # Calculate path segments
-        segments = []
-        total_length = 0
-        total_turns = 0
-        valid = True
+    goals = list(dict.fromkeys(goals))
+    matrix = segment_matrix(maze, [start] + goals, exact, cost_model, graph, distance_fields)
+    if cost_model is None:
+        cost_model = TURN_COUNT_COST
 
-        for i in range(len(waypoints) - 1):
-            segment = astar_straight_preference(maze, waypoints[i], waypoints[i + 1])
+    if ordering == "auto":
+        if len(goals) <= MAX_PERMUTATION_GOALS:
+            ordering = "permutations"
+        elif len(goals) <= MAX_EXACT_GOALS:
+            ordering = "held_karp"
+        else:
+            ordering = "heuristic"
 
-            if segment is None:
-                valid = False
-                break
+    if ordering == "permutations":
+        best_order = order_goals_permutations(start, goals, matrix, cost_model, detections, bearing)
+    elif ordering == "held_karp":
+        best_order = order_goals_held_karp(start, goals, matrix, cost_model, detections, bearing)
+    elif ordering == "heuristic":
+        best_order = order_goals_nearest_neighbor(start, goals, matrix, time_limit, cost_model, detections, bearing)
+    else:
+        raise ValueError(f"Unknown goal ordering: {ordering}")
 
-            segments.append(segment)
-            total_length += len(segment) - 1
-            total_turns += count_turns(segment)
+    if best_order is None:
+        return None
 
-        if valid:
-            # Prefer shorter paths, break ties with fewer turns
-            if (total_length < best_length or
-                    (total_length == best_length and total_turns < best_turns)):
-                best_length = total_length
-                best_turns = total_turns
-                best_segments = segments
+    return segments_for_order(matrix, best_order)
 
-    return best_segments
+def segments_for_order(matrix, waypoints):
+    """Look up the cached path segment for each leg of an ordered list of waypoints"""
+    segments = []
+    for i in range(len(waypoints) - 1):
+        if waypoints[i] == waypoints[i + 1]:
+            segments.append([waypoints[i]])
+        else:
+            segments.append(matrix[(waypoints[i], waypoints[i + 1])][0])
+    return segments
@@ -0,0 +1,270 @@
+import math
+import random
+import time
+import Utils
+
+# Plane_getBarrier() sides, clockwise from the drone's nose
+BARRIER_SIDES = {"forward": 0, "right": 90, "back": 180, "left": 270}
+
+# Cell offset of each yaw
+YAW_OFFSETS = {0: (0, 1), 90: (1, 0), 180: (0, -1), 270: (-1, 0)}
+
+BLOCK_SIZE = 60
+BLOCK_OFFSET = 15
+TAKEOFF_HEIGHT = 90
+
+# Simulated flights block for CELL_FLIGHT_TIME per cell, then the drone settles
+# for SETTLE_TIME from an overshoot of SETTLE_OVERSHOOT cm past the target
+CELL_FLIGHT_TIME = 0.05
+SETTLE_TIME = 0.3
+SETTLE_OVERSHOOT = 12
+
+class SimulatedUserApi:
+    """
+    In-process stand-in for pyhula.UserApi flying over a known maze, for
+    running discovery and races without hardware. Implements the calls Drone
+    makes: flights move the drone cell by cell and stop in front of the first
+    wall, Plane_getBarrier() reports the walls around the current cell
+    relative to the drone's yaw, and get_coordinate()/get_yaw() return the
+    position with optional Gaussian noise. After each flight the drone
+    settles for a while on the virtual clock, with telemetry reporting the
+    decaying overshoot; commands sent before it settles are counted. Turns
+    block for rotation_time(), like pyhula's.
+
+    With time_warp (the default) sleep() only advances a virtual clock, so a
+    whole mission runs in milliseconds while elapsed still reports the time
+    it would have taken. Pass api.sleep and api.clock to Drone to route its
+    settle sleeps and arrival timing through the simulator, and create_vision
+    as its vision factory.
+
+    Args:
+        maze: Maze to fly in
+        start: (x, y) cell the drone starts in
+        bearing: "North", "East", "South" or "West" the drone starts facing
+        latency: seconds each API call takes, like a wifi round trip
+        noise: standard deviation of telemetry noise, in centimeters (or
+               degrees for yaw)
+        telemetry_offset: constant (x, y) error in centimeters added to
+                          get_coordinate(), like a drifted position estimate
+        time_warp: skip real sleeping and only advance the virtual clock
+        seed: random seed for noise and detections
+        objects: {((x, y), bearing): label} objects for the simulated detector
+        detection_rate: chance that one detector try spots an object
+    """
+    def __init__(self, maze, start=(0, 0), bearing="North", latency=0.0, noise=0.0, time_warp=True, seed=None,
+                 objects=None, detection_rate=0.5, telemetry_offset=(0, 0)):
+        self.maze = maze
+        self.latency = latency
+        self.noise = noise
+        self.telemetry_offset = telemetry_offset
+        self.time_warp = time_warp
+        self.random = random.Random(seed)
+        self.objects = {} if objects is None else objects
+        self.detection_rate = detection_rate
+
+        self.x = BLOCK_SIZE * start[0] + BLOCK_OFFSET
+        self.y = BLOCK_SIZE * start[1] + BLOCK_OFFSET
+        self.z = 0
+        self.yaw = Utils.bearing_yaw(bearing)
+        self.takeoff_yaw = self.yaw
+
+        self.elapsed = 0.0
+        self.busy_until = 0.0
+        self.overshoot = (0, 0)
+        self.flying = False
+        self.connected = False
+
+        # Mission statistics
+        self.calls = 0
+        self.moves = 0
+        self.turns = 0
+        self.scans = 0
+        self.collisions = 0
+        self.early_commands = 0
+        self.flight_distance = 0
+
+    @classmethod
+    def from_maze_file(cls, filename, **kwargs):
+        maze = Utils.load_maze_from_file(filename)
+        if maze is None:
+            raise FileNotFoundError(filename)
+        return cls(maze, **kwargs)
+
+    def clock(self):
+        """time.monotonic() replacement reading the virtual clock"""
+        return self.elapsed
+
+    def sleep(self, seconds):
+        """time.sleep() replacement advancing the virtual clock"""
+        if seconds <= 0:
+            return
+        self.elapsed += seconds
+        if not self.time_warp:
+            time.sleep(seconds)
+
+    @property
+    def cell(self):
+        return (math.floor(self.x / BLOCK_SIZE), math.floor(self.y / BLOCK_SIZE))
+
+    def _call(self):
+        self.calls += 1
+        self.sleep(self.latency)
+
+    def _noisy(self, value):
+        if self.noise:
+            return value + self.random.gauss(0, self.noise)
+        return value
+
+    # Connection and configuration
+
+    def connect(self):
+        self._call()
+        self.connected = True
+        return True
+
+    def single_fly_barrier_aircraft(self, enabled):
+        self._call()
+
+    def Plane_cmd_switch_QR(self, mode):
+        self._call()
+
+    def Plane_cmd_camera_angle(self, mode, angle):
+        self._call()
+
+    # Flight
+
+    def single_fly_takeoff(self):
+        self._call()
+        self.flying = True
+        self.z = TAKEOFF_HEIGHT
+
+    def single_fly_touchdown(self):
+        self._call()
+        self.flying = False
+        self.z = 0
+
+    def single_fly_straight_flight(self, x, y, z, speed):
+        self._call()
+        if self.elapsed < self.busy_until:
+            # Commanded before the previous flight could have settled
+            self.early_commands += 1
+
+        start = self.cell
+        target = (math.floor(x / BLOCK_SIZE), math.floor(y / BLOCK_SIZE))
+        reached = self._fly_cells(start, target)
+        if reached == target:
+            self.x, self.y = x, y
+        else:
+            self.collisions += 1
+            self.x = BLOCK_SIZE * reached[0] + BLOCK_OFFSET
+            self.y = BLOCK_SIZE * reached[1] + BLOCK_OFFSET
+        self.z = z
+
+        distance = Utils.length(start, reached)
+        if distance:
+            self.moves += 1
+            self.flight_distance += distance
+            self.sleep(CELL_FLIGHT_TIME * distance)
+            self.overshoot = (SETTLE_OVERSHOOT * ((reached[0] > start[0]) - (reached[0] < start[0])),
+                              SETTLE_OVERSHOOT * ((reached[1] > start[1]) - (reached[1] < start[1])))
+        else:
+            self.overshoot = (0, 0)
+        self.busy_until = self.elapsed + SETTLE_TIME
+
+    def _fly_cells(self, start, target):
+        """Fly cell by cell along x then y, returning the cell where the drone stops"""
+        current = start
+        for axis in (0, 1):
+            step = (target[axis] > current[axis]) - (target[axis] < current[axis])
+            while current[axis] != target[axis]:
+                next_cell = (current[0] + step, current[1]) if axis == 0 else (current[0], current[1] + step)
+                if not self.maze.in_bounds(next_cell) or not self.maze.is_passable(current, next_cell):
+                    return current
+                current = next_cell
+        return current
+
+    def single_fly_turnleft(self, degrees):
+        self._call()
+        self.turns += 1
+        self.sleep(Utils.rotation_time(degrees / 90))
+        self.yaw = (self.yaw - degrees) % 360
+
+    def single_fly_turnright(self, degrees):
+        self._call()
+        self.turns += 1
+        self.sleep(Utils.rotation_time(degrees / 90))
+        self.yaw = (self.yaw + degrees) % 360
+
+    # Telemetry
+
+    def position(self):
+        """(x, y) on the virtual clock, the overshoot decaying linearly while the drone settles"""
+        if self.elapsed >= self.busy_until:
+            return self.x, self.y
+        remaining = (self.busy_until - self.elapsed) / SETTLE_TIME
+        return self.x + self.overshoot[0] * remaining, self.y + self.overshoot[1] * remaining
+
+    def get_coordinate(self):
+        self._call()
+        x, y = self.position()
+        return (self._noisy(x + self.telemetry_offset[0]), self._noisy(y + self.telemetry_offset[1]),
+                self._noisy(self.z))
+
+    def get_yaw(self):
+        """(yaw, pitch, roll), yaw in degrees clockwise from the takeoff heading"""
+        self._call()
+        yaw = (self.yaw - self.takeoff_yaw + 180) % 360 - 180
+        return self._noisy(yaw), 0, 0
+
+    def Plane_getBarrier(self):
+        self._call()
+        self.scans += 1
+        cell = self.cell
+        heading = round(self.yaw / 90) * 90 % 360
+        obstacles = {}
+        for side, offset in BARRIER_SIDES.items():
+            dx, dy = YAW_OFFSETS[(heading + offset) % 360]
+            neighbor = (cell[0] + dx, cell[1] + dy)
+            obstacles[side] = not self.maze.in_bounds(neighbor) or not self.maze.is_passable(cell, neighbor)
+        return obstacles
+
+    # Vision
+
+    def facing_object(self):
+        heading = round(self.yaw / 90) * 90 % 360
+        return self.objects.get((self.cell, Utils.BEARINGS[heading // 90]))
+
+def create_vision(api):
+    """(video, detector) pair standing in for hula_video and onnxdetector, seeing api's objects"""
+    return SimulatedVideo(api), SimulatedDetector(api)
+
+class SimulatedVideo:
+    """Video stream whose frames are the object label the drone faces, if any"""
+    def __init__(self, api):
+        self.api = api
+        self.recording = None
+
+    def video_mode_on(self):
+        pass
+
+    def startrecording(self, name):
+        self.recording = name
+
+    def stoprecording(self):
+        self.recording = None
+
+    def get_video(self):
+        return self.api.facing_object()
+
+    def close(self):
+        pass
+
+class SimulatedDetector:
+    """Detector spotting the object in a simulated frame with a fixed chance per try"""
+    def __init__(self, api):
+        self.api = api
+
+    def detect(self, frame):
+        if frame is not None and self.api.random.random() < self.api.detection_rate:
+            return {'label': frame}, None
+        return None, None
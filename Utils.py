@@ -1,8 +1,38 @@
+import hashlib
 import json
 import os
+import struct
 from Maze import Maze
 
-def save_maze_to_file(maze, filename="maze.txt"):
+# Binary maze file: magic, format version, width, height, wall count,
+# then one wall bitmask byte per cell (see Maze)
+BINARY_MAZE_MAGIC = b"PHMZ"
+BINARY_MAZE_VERSION = 1
+BINARY_MAZE_HEADER = "<4sB3xIII"
+# Binary mazes get their own extension; .txt maze files stay JSON
+BINARY_MAZE_EXTENSION = ".maze"
+
+# Settle time after each straight leg: base + length * increment seconds.
+# Shared by Drone.move_to_block() and the planner's flight time cost model.
+SLEEP_BASE_VALUE = 0.4
+SLEEP_INCREMENT_VALUE = 0.1
+
+# Seconds a blocking pyhula single_fly_turnleft/right(90) call takes, charged
+# per quarter turn by the planner's flight time cost model. Measure it on the
+# drone with `python -m PyhulaPlayground.Benchmark --measure-turns`.
+TURN_TIME_PER_QUARTER = 1.0
+
+# Drone bearings in clockwise order, 90 degrees of yaw apart starting at North
+BEARINGS = ["North", "East", "South", "West"]
+
+def save_maze_to_file(maze, filename="maze.txt", binary=False):
+    # Plans for the previous maze in this file are stale now
+    clear_plan_cache(filename)
+
+    if binary:
+        save_maze_to_binary_file(maze, filename)
+        return
+
     maze_data = {
         'width': maze.width,
         'height': maze.height,
@@ -10,13 +40,31 @@ def save_maze_to_file(maze, filename="maze.txt"):
     }
     with open(filename, 'w') as f:
         json.dump(maze_data, f)
-    print(f"Maze saved: {maze.width}x{maze.height} with {len(maze.walls)} walls")
+    print(f"Maze saved: {maze.width}x{maze.height} with {maze.wall_count} walls")
+
+def save_maze_to_binary_file(maze, filename="maze.maze"):
+    """Write the header followed by the maze's per-cell wall bitmask array"""
+    header = struct.pack(BINARY_MAZE_HEADER, BINARY_MAZE_MAGIC, BINARY_MAZE_VERSION,
+                         maze.width, maze.height, maze.wall_count)
+
+    # Write next to the target and swap it in, so a crash mid-write never leaves a truncated maze
+    temp_filename = filename + ".tmp"
+    with open(temp_filename, 'wb') as f:
+        f.write(header)
+        f.write(maze.cells)
+    os.replace(temp_filename, filename)
+    print(f"Maze saved: {maze.width}x{maze.height} with {maze.wall_count} walls (binary)")
 
 def load_maze_from_file(filename="maze.txt"):
     if not os.path.exists(filename):
         print(f"{filename} not found. Need to discover maze first.")
         return None
 
+    with open(filename, 'rb') as f:
+        is_binary = f.read(len(BINARY_MAZE_MAGIC)) == BINARY_MAZE_MAGIC
+    if is_binary:
+        return load_maze_from_binary_file(filename)
+
     with open(filename, 'r') as f:
         maze_data = json.load(f)
 
@@ -27,9 +75,105 @@ def load_maze_from_file(filename="maze.txt"):
         cell2 = tuple(wall[1])
         maze.add_wall(cell1, cell2)
 
-    print(f"Maze loaded: {maze.width}x{maze.height} with {len(maze.walls)} walls")
+    print(f"Maze loaded: {maze.width}x{maze.height} with {maze.wall_count} walls")
     return maze
 
+def load_maze_from_files(filenames):
+    """Load the first of filenames that exists, e.g. a discovered binary maze before the JSON maze it supersedes"""
+    for filename in filenames:
+        if os.path.exists(filename):
+            return load_maze_from_file(filename)
+    print(f"{' or '.join(filenames)} not found. Need to discover maze first.")
+    return None
+
+def load_maze_from_binary_file(filename="maze.maze"):
+    """
+    Read a binary maze file straight into the wall bitmask array with one
+    read, so no per-wall Python objects are built. The bytes are copied
+    rather than memory-mapped so the file is not held open and can be
+    replaced by the next discovery, which Windows refuses for mapped files.
+    """
+    header_size = struct.calcsize(BINARY_MAZE_HEADER)
+    with open(filename, 'rb') as f:
+        magic, version, width, height, wall_count = struct.unpack(BINARY_MAZE_HEADER, f.read(header_size))
+        if magic != BINARY_MAZE_MAGIC or version != BINARY_MAZE_VERSION:
+            raise ValueError(f"{filename} is not a version {BINARY_MAZE_VERSION} binary maze file")
+        if os.fstat(f.fileno()).st_size != header_size + width * height:
+            raise ValueError(f"{filename} is truncated or corrupt")
+
+        cells = bytearray(width * height)
+        f.readinto(cells)
+
+    maze = Maze(width, height, cells, wall_count)
+    print(f"Maze loaded: {maze.width}x{maze.height} with {maze.wall_count} walls (binary)")
+    return maze
+
+def maze_content_hash(maze):
+    """Hash of the maze size and walls, identifying the maze a plan was made for"""
+    digest = hashlib.sha256(struct.pack("<II", maze.width, maze.height))
+    digest.update(maze.cells)
+    return digest.hexdigest()
+
+def plan_cache_filename(maze_filename):
+    """Plan cache stored next to the maze file, e.g. maze_challenge_1.plans.json"""
+    return os.path.splitext(maze_filename)[0] + ".plans.json"
+
+def clear_plan_cache(maze_filename):
+    cache_filename = plan_cache_filename(maze_filename)
+    if os.path.exists(cache_filename):
+        os.remove(cache_filename)
+
+def _read_plan_cache(maze_filename, maze_hash):
+    cache_filename = plan_cache_filename(maze_filename)
+    if not os.path.exists(cache_filename):
+        return {}
+    try:
+        with open(cache_filename, 'r') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get('maze_hash') != maze_hash:
+        return {}
+    return cache.get('plans', {})
+
+def _to_cells(value):
+    """Turn JSON lists back into (x, y) cell tuples, keeping the nesting of paths and segments"""
+    if all(isinstance(item, int) for item in value):
+        return tuple(value)
+    return [_to_cells(item) for item in value]
+
+def load_cached_plan(maze_filename, maze, query):
+    """
+    Look up a plan made earlier for this exact maze and query.
+
+    Args:
+        maze_filename: file the maze was loaded from
+        maze: the loaded Maze object
+        query: JSON-serializable dict of everything the plan depends on
+               (planner, cost model, start, goals, ...)
+
+    Returns:
+        the cached path or list of segments, or None on a cache miss
+    """
+    plans = _read_plan_cache(maze_filename, maze_content_hash(maze))
+    plan = plans.get(json.dumps(query, sort_keys=True))
+    if plan is None:
+        return None
+    print(f"Plan loaded from cache: {plan_cache_filename(maze_filename)}")
+    return _to_cells(plan)
+
+def save_cached_plan(maze_filename, maze, query, plan):
+    """Store a plan for this maze and query, dropping plans made for any other maze"""
+    maze_hash = maze_content_hash(maze)
+    plans = _read_plan_cache(maze_filename, maze_hash)
+    plans[json.dumps(query, sort_keys=True)] = plan
+
+    cache_filename = plan_cache_filename(maze_filename)
+    temp_filename = cache_filename + ".tmp"
+    with open(temp_filename, 'w') as f:
+        json.dump({'maze_hash': maze_hash, 'plans': plans}, f)
+    os.replace(temp_filename, cache_filename)
+
 def optimized_path(path):
 
     if len(path) <= 2:
@@ -73,4 +217,24 @@ def length(coordinate1, coordinate2):
     elif dy == 0:
         return abs(dx)
 
-    return 1
\ No newline at end of file
+    return 1
+
+def leg_time(movement_length):
+    """Estimated seconds to fly and settle one straight leg of movement_length cells"""
+    return SLEEP_BASE_VALUE + (movement_length * SLEEP_INCREMENT_VALUE)
+
+def bearing_yaw(bearing):
+    """Yaw of bearing in degrees, clockwise from North"""
+    return BEARINGS.index(bearing) * 90
+
+def rotation_time(quarters):
+    """Seconds the drone takes to yaw by quarters quarter turns"""
+    return quarters * TURN_TIME_PER_QUARTER
+
+def path_flight_time(path):
+    """Estimated seconds to fly a cell path as collapsed straight legs"""
+    waypoints = optimized_path(path)
+    total = 0.0
+    for i in range(len(waypoints) - 1):
+        total += leg_time(length(waypoints[i], waypoints[i + 1]))
+    return total
@@ -0,0 +1,64 @@
+import os
+import random
+import sys
+
+# The modules import each other by bare name (import Utils), as when run from the repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Maze import Maze, DIRECTIONS
+
+def random_maze(width, height, seed, extra_openings=0.0):
+    """Recursive-backtracker maze with a fraction of its remaining walls knocked out, so it has loops"""
+    rng = random.Random(seed)
+    opened = set()
+    seen = {(0, 0)}
+    stack = [(0, 0)]
+    while stack:
+        cell = stack[-1]
+        neighbors = [(cell[0] + dx, cell[1] + dy) for dx, dy, _ in DIRECTIONS
+                     if 0 <= cell[0] + dx < width and 0 <= cell[1] + dy < height
+                     and (cell[0] + dx, cell[1] + dy) not in seen]
+        if not neighbors:
+            stack.pop()
+            continue
+        neighbor = rng.choice(neighbors)
+        seen.add(neighbor)
+        opened.add(frozenset((cell, neighbor)))
+        stack.append(neighbor)
+
+    maze = Maze(width, height)
+    for y in range(height):
+        for x in range(width):
+            for neighbor in ((x + 1, y), (x, y + 1)):
+                if maze.in_bounds(neighbor) and frozenset(((x, y), neighbor)) not in opened \
+                        and rng.random() >= extra_openings:
+                    maze.add_wall((x, y), neighbor)
+    return maze
+
+def simple_paths(maze, start, goal):
+    """Every path from start to goal that visits no cell twice, by exhaustive search"""
+    path = [start]
+    on_path = {start}
+
+    def extend():
+        if path[-1] == goal:
+            yield list(path)
+            return
+        for neighbor in maze.get_neighbors(path[-1]):
+            if neighbor not in on_path:
+                path.append(neighbor)
+                on_path.add(neighbor)
+                yield from extend()
+                on_path.remove(neighbor)
+                path.pop()
+
+    yield from extend()
+
+def cheapest_cost(maze, start, goal, cost_model):
+    """Lowest cost_model cost over every simple path, or None if goal is unreachable"""
+    costs = [cost_model.path_cost(path) for path in simple_paths(maze, start, goal)]
+    return min(costs) if costs else None
+
+def assert_valid_path(maze, path, start, goal):
+    assert path[0] == start and path[-1] == goal
+    assert all(maze.is_passable(path[i], path[i + 1]) for i in range(len(path) - 1))
@@ -0,0 +1,99 @@
+import itertools
+
+import pytest
+
+import PathFinder
+import Utils
+from Maze import Maze
+from conftest import random_maze, cheapest_cost, assert_valid_path
+
+MAZES = [random_maze(5, 4, seed, extra_openings) for seed, extra_openings in [(1, 0.3), (2, 0.5), (3, 0.8)]]
+
+def cell_pairs(maze, stride=3):
+    cells = [(x, y) for y in range(maze.height) for x in range(maze.width)]
+    return [pair for pair in itertools.permutations(cells, 2)][::stride]
+
+@pytest.mark.parametrize("maze", MAZES)
+def test_heading_state_search_is_optimal_in_steps_then_turns(maze):
+    for start, goal in cell_pairs(maze):
+        path = PathFinder.astar_heading_state(maze, start, goal)
+
+        assert_valid_path(maze, path, start, goal)
+        assert PathFinder.TURN_COUNT_COST.path_cost(path) == cheapest_cost(maze, start, goal, PathFinder.TURN_COUNT_COST)
+
+def test_heading_state_search_without_a_path():
+    maze = Maze(3, 3)
+    for neighbor in ((1, 1), (0, 1), (2, 1)):
+        maze.add_wall((neighbor[0], 2), neighbor)
+
+    assert PathFinder.astar_heading_state(maze, (0, 0), (1, 2)) is None
+    assert PathFinder.astar_heading_state(maze, (1, 1), (1, 1)) == [(1, 1)]
+
+def test_flight_time_cost_matches_the_drone_timing():
+    cost_model = PathFinder.FlightTimeCost()
+    path = [(0, 0), (0, 1), (0, 2), (1, 2), (2, 2), (2, 1)]
+
+    cost = cost_model.path_cost(path)
+
+    assert isinstance(cost, int)
+    assert cost == round(Utils.path_flight_time(path) * 1000)
+    # Three straight legs of 2, 2 and 1 cells
+    assert cost == 3 * cost_model.base + 5 * cost_model.increment
+    assert cost_model.rotate(cost, 2) == cost + 2 * round(Utils.TURN_TIME_PER_QUARTER * 1000)
+
+def test_flight_time_cost_steps_add_up_to_the_path_cost():
+    cost_model = PathFinder.FlightTimeCost()
+    path = [(0, 0), (1, 0), (2, 0), (2, 1), (1, 1), (1, 2)]
+
+    cost = cost_model.zero
+    heading = None
+    for i in range(len(path) - 1):
+        direction = (path[i + 1][0] - path[i][0], path[i + 1][1] - path[i][1])
+        cost = cost_model.step(cost, heading, direction)
+        heading = direction
+
+    assert cost == cost_model.path_cost(path)
+
+@pytest.mark.parametrize("maze", MAZES)
+def test_heading_state_search_is_optimal_in_flight_time(maze):
+    cost_model = PathFinder.FlightTimeCost()
+    for start, goal in cell_pairs(maze):
+        path = PathFinder.astar_heading_state(maze, start, goal, cost_model)
+
+        assert_valid_path(maze, path, start, goal)
+        assert cost_model.path_cost(path) == cheapest_cost(maze, start, goal, cost_model)
+
+@pytest.mark.parametrize("maze", MAZES)
+def test_distance_field_matches_exhaustive_search(maze):
+    goal = (maze.width - 1, maze.height - 1)
+    field = PathFinder.distance_field(maze, goal)
+
+    for y in range(maze.height):
+        for x in range(maze.width):
+            steps = cheapest_cost(maze, (x, y), goal, PathFinder.TURN_COUNT_COST)
+            assert field.distance((x, y)) == steps[0]
+    assert field.grid()[0][0] == field.distance((0, 0))
+    assert field.distance((-1, 0)) is None
+
+def test_distance_field_of_unreachable_cells():
+    maze = Maze(3, 3)
+    for neighbor in ((1, 1), (0, 1), (2, 1)):
+        maze.add_wall((neighbor[0], 2), neighbor)
+
+    field = PathFinder.distance_field(maze, (0, 0))
+
+    assert [field.distance((x, 2)) for x in range(3)] == [None, None, None]
+    assert field.distance((2, 1)) == 3
+
+@pytest.mark.parametrize("cost_model", [None, PathFinder.FlightTimeCost()])
+def test_distance_field_heuristic_keeps_routes_optimal(cost_model):
+    maze = MAZES[1]
+    scoring = PathFinder.TURN_COUNT_COST if cost_model is None else cost_model
+    for goal in [(0, 0), (4, 3), (2, 1)]:
+        field = PathFinder.distance_field(maze, goal)
+        for start in [(x, y) for y in range(maze.height) for x in range(maze.width) if (x, y) != goal]:
+            path = PathFinder.astar_heading_state(maze, start, goal, cost_model, distances=field)
+            assert scoring.path_cost(path) == cheapest_cost(maze, start, goal, scoring)
+
+    with pytest.raises(ValueError):
+        PathFinder.astar_heading_state(maze, (0, 0), (1, 1), distances=PathFinder.distance_field(maze, (2, 2)))
@@ -0,0 +1,103 @@
+import pytest
+
+import PathFinder
+from Drone import Drone
+from Maze import Maze
+from Simulator import SimulatedUserApi
+from DiscoveryLog import DiscoveryLog
+from conftest import random_maze
+
+def discover_drone(truth):
+    """Airborne Drone flying a simulator over truth"""
+    api = SimulatedUserApi(truth, seed=0)
+    drone = Drone(api=api, sleep=api.sleep, clock=api.clock)
+    drone.take_off()
+    return drone
+
+def discover(truth, maze, strategy, **kwargs):
+    drone = discover_drone(truth)
+    PathFinder.discover_maze(maze, (0, 0), drone, strategy=strategy, **kwargs)
+    return drone.raw_api
+
+@pytest.mark.parametrize("strategy", ["dfs", "frontier"])
+@pytest.mark.parametrize("seed, extra_openings", [(1, 0.0), (2, 0.3), (3, 0.6)])
+def test_discovered_maze_matches_true_maze(strategy, seed, extra_openings):
+    truth = random_maze(8, 6, seed, extra_openings)
+    maze = Maze(truth.width, truth.height)
+
+    api = discover(truth, maze, strategy)
+
+    assert bytes(maze.cells) == bytes(truth.cells)
+    assert maze.wall_count == truth.wall_count
+    assert api.collisions == 0
+
+@pytest.mark.parametrize("strategy", ["dfs", "frontier"])
+def test_shrink_to_fit_matches_true_maze(strategy):
+    truth = random_maze(7, 5, seed=4, extra_openings=0.3)
+    maze = Maze(20, 20)
+
+    discover(truth, maze, strategy, shrink_to_fit=True)
+
+    assert (maze.width, maze.height) == (truth.width, truth.height)
+    assert bytes(maze.cells) == bytes(truth.cells)
+    assert maze.wall_count == truth.wall_count
+
+def interrupted_log(truth, filename, lines=6):
+    """Log of a discovery of truth cut off after its first lines, as if the battery died there"""
+    discover(truth, Maze(truth.width, truth.height), "frontier", log_file=filename)
+    with open(filename) as f:
+        kept = [line for line in f if '"done"' not in line][:lines]
+    with open(filename, 'w') as f:
+        f.writelines(kept)
+
+def test_discovery_resumed_from_log_matches_true_maze(tmp_path):
+    truth = random_maze(8, 6, seed=5, extra_openings=0.3)
+    filename = str(tmp_path / "maze.discovery.log")
+    interrupted_log(truth, filename)
+    maze = Maze(truth.width, truth.height)
+    assert DiscoveryLog(filename).count_resumable_cells(maze, (0, 0), "frontier") == 5
+
+    discover(truth, maze, "frontier", log_file=filename, resume=True)
+
+    assert bytes(maze.cells) == bytes(truth.cells)
+    assert DiscoveryLog(filename).read_resumable(maze, (0, 0), "frontier") is None
+
+def test_discovery_ignores_an_old_log_unless_resuming(tmp_path):
+    filename = str(tmp_path / "maze.discovery.log")
+    interrupted_log(random_maze(8, 6, seed=6), filename)
+    # The arena was rebuilt before the next discovery
+    rebuilt = random_maze(8, 6, seed=7)
+    maze = Maze(rebuilt.width, rebuilt.height)
+
+    discover(rebuilt, maze, "frontier", log_file=filename)
+
+    assert bytes(maze.cells) == bytes(rebuilt.cells)
+
+@pytest.mark.parametrize("seed, extra_openings, targets", [
+    (8, 0.3, [(9, 7)]),
+    (9, 0.5, [(9, 0), (5, 7), (0, 7)]),
+    (10, 0.8, [(4, 4), (9, 7)]),
+])
+def test_goal_directed_discovery_proves_the_fastest_routes(seed, extra_openings, targets):
+    truth = random_maze(10, 8, seed, extra_openings)
+    maze = Maze(truth.width, truth.height)
+    cost_model = PathFinder.FlightTimeCost()
+
+    _, cells_explored = PathFinder.discover_maze(maze, (0, 0), discover_drone(truth), strategy="frontier",
+                                                 targets=targets)
+
+    assert cells_explored < truth.width * truth.height
+    waypoints = [(0, 0)] + targets
+    for start in waypoints:
+        for goal in waypoints:
+            if start == goal:
+                continue
+            route = PathFinder.astar_heading_state(maze, start, goal, cost_model)
+            assert all(truth.is_passable(route[i], route[i + 1]) for i in range(len(route) - 1))
+            fastest = PathFinder.astar_heading_state(truth, start, goal, cost_model)
+            assert cost_model.path_cost(route) == cost_model.path_cost(fastest)
+
+def test_goal_directed_discovery_needs_the_frontier_strategy():
+    truth = random_maze(4, 4, seed=1)
+    with pytest.raises(ValueError):
+        PathFinder.discover_maze(Maze(4, 4), (0, 0), discover_drone(truth), strategy="dfs", targets=[(3, 3)])
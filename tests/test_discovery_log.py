@@ -0,0 +1,50 @@
+from DiscoveryLog import DiscoveryLog
+from Maze import Maze
+
+START = (0, 0)
+
+def write_log(filename, visits, finish=False):
+    log = DiscoveryLog(filename)
+    log.begin(Maze(4, 4), START, "frontier")
+    for cell, walls in visits:
+        log.record_visit(cell, walls)
+    if finish:
+        log.finish()
+    else:
+        log.close()
+    return log
+
+def test_resume_after_truncated_line(tmp_path):
+    filename = str(tmp_path / "maze.discovery.log")
+    log = write_log(filename, [((0, 0), [(1, 0)]), ((0, 1), None)])
+    # Crash halfway through writing the next record
+    with open(filename, 'a') as f:
+        f.write('{"event": "visit", "cell": [0, ')
+
+    records = log.read_resumable(Maze(4, 4), START, "frontier")
+    assert [record['cell'] for record in records] == [[0, 0], [0, 1]]
+
+    log.resume()
+    log.record_visit((0, 2), [])
+    log.close()
+
+    records = log.read_resumable(Maze(4, 4), START, "frontier")
+    assert [record['cell'] for record in records] == [[0, 0], [0, 1], [0, 2]]
+    with open(filename) as f:
+        assert all(line.endswith("\n") for line in f)
+
+def test_finished_log_is_not_resumed(tmp_path):
+    filename = str(tmp_path / "maze.discovery.log")
+    log = write_log(filename, [((0, 0), [])], finish=True)
+
+    assert log.read()[-1] == {'event': 'done'}
+    assert log.read_resumable(Maze(4, 4), START, "frontier") is None
+
+def test_log_of_another_discovery_is_not_resumed(tmp_path):
+    filename = str(tmp_path / "maze.discovery.log")
+    log = write_log(filename, [((0, 0), [])])
+
+    assert log.read_resumable(Maze(5, 4), START, "frontier") is None
+    assert log.read_resumable(Maze(4, 4), (1, 0), "frontier") is None
+    assert log.read_resumable(Maze(4, 4), START, "dfs") is None
+    assert DiscoveryLog(str(tmp_path / "missing.log")).read_resumable(Maze(4, 4), START, "frontier") is None
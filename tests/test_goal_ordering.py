@@ -0,0 +1,162 @@
+import itertools
+
+import pytest
+
+import PathFinder
+import Utils
+from Drone import Drone
+from Simulator import SimulatedUserApi
+from JunctionGraph import JunctionGraph
+from conftest import random_maze, assert_valid_path
+
+MAZE = random_maze(8, 8, seed=11, extra_openings=0.4)
+START = (0, 0)
+GOALS = [(7, 7), (2, 6), (6, 1), (4, 4), (0, 7), (7, 3)]
+COST_MODELS = [PathFinder.TURN_COUNT_COST, PathFinder.FlightTimeCost()]
+
+def cheapest_order_cost(matrix, goals, cost_model, detections=None, bearing=None):
+    """Lowest order_cost() over every permutation of goals"""
+    costs = [PathFinder.order_cost(matrix, [START] + list(order), cost_model, detections, bearing)
+             for order in itertools.permutations(goals)]
+    return min(cost for cost in costs if cost is not None)
+
+def assert_visits_every_goal(order, goals):
+    assert order[0] == START and sorted(order[1:]) == sorted(goals)
+
+@pytest.mark.parametrize("cost_model", COST_MODELS)
+def test_segment_matrix_plans_every_leg_once(cost_model):
+    waypoints = [START] + GOALS
+    matrix = PathFinder.segment_matrix(MAZE, waypoints, cost_model=cost_model)
+
+    assert set(matrix) == {(a, b) for a in waypoints for b in GOALS if a != b}
+    for (from_cell, to_cell), (segment, cost) in matrix.items():
+        assert_valid_path(MAZE, segment, from_cell, to_cell)
+        assert cost == cost_model.path_cost(segment)
+        assert cost == cost_model.path_cost(PathFinder.astar_heading_state(MAZE, from_cell, to_cell, cost_model))
+
+@pytest.mark.parametrize("cost_model", COST_MODELS)
+def test_segment_matrix_variants_agree(cost_model):
+    waypoints = [START] + GOALS[:4]
+    expected = PathFinder.segment_matrix(MAZE, waypoints, cost_model=cost_model)
+
+    for matrix in (PathFinder.segment_matrix(MAZE, waypoints, cost_model=cost_model, graph=JunctionGraph(MAZE)),
+                   PathFinder.segment_matrix(MAZE, waypoints, cost_model=cost_model, distance_fields=True)):
+        assert {leg: entry[1] for leg, entry in matrix.items()} == {leg: entry[1] for leg, entry in expected.items()}
+
+def test_segment_matrix_marks_unreachable_legs():
+    maze = random_maze(4, 4, seed=1)
+    for neighbor in maze.get_neighbors((3, 3)):
+        maze.add_wall((3, 3), neighbor)
+
+    matrix = PathFinder.segment_matrix(maze, [START, (3, 3), (1, 1)], distance_fields=True)
+
+    assert matrix[(START, (3, 3))] is None and matrix[((1, 1), (3, 3))] is None
+    assert PathFinder.order_cost(matrix, [START, (1, 1), (3, 3)]) is None
+    assert PathFinder.astar_multi_goal_straight_preference(maze, START, [(1, 1), (3, 3)]) is None
+
+def test_order_cost_adds_up_the_legs():
+    matrix = PathFinder.segment_matrix(MAZE, [START] + GOALS[:3], exact=True)
+    waypoints = [START] + GOALS[:3]
+
+    legs = [matrix[(waypoints[i], waypoints[i + 1])][1] for i in range(3)]
+
+    assert PathFinder.order_cost(matrix, waypoints) == tuple(map(sum, zip(*legs)))
+
+@pytest.mark.parametrize("cost_model", COST_MODELS)
+def test_held_karp_finds_the_cheapest_order(cost_model):
+    matrix = PathFinder.segment_matrix(MAZE, [START] + GOALS, cost_model=cost_model)
+
+    order = PathFinder.order_goals_held_karp(START, GOALS, matrix, cost_model)
+
+    assert_visits_every_goal(order, GOALS)
+    assert PathFinder.order_cost(matrix, order, cost_model) == cheapest_order_cost(matrix, GOALS, cost_model)
+    assert PathFinder.order_cost(matrix, PathFinder.order_goals_permutations(START, GOALS[:4], matrix, cost_model),
+                                 cost_model) == cheapest_order_cost(matrix, GOALS[:4], cost_model)
+
+@pytest.mark.parametrize("cost_model", COST_MODELS)
+def test_two_opt_leaves_no_improving_reversal(cost_model):
+    matrix = PathFinder.segment_matrix(MAZE, [START] + GOALS, cost_model=cost_model)
+
+    order = PathFinder.order_goals_nearest_neighbor(START, GOALS, matrix, time_limit=None, cost_model=cost_model)
+
+    assert_visits_every_goal(order, GOALS)
+    cost = PathFinder.order_cost(matrix, order, cost_model)
+    assert cost >= cheapest_order_cost(matrix, GOALS, cost_model)
+    for i in range(1, len(order) - 1):
+        for k in range(i + 1, len(order)):
+            reversed_order = order[:i] + order[i:k + 1][::-1] + order[k + 1:]
+            assert PathFinder.order_cost(matrix, reversed_order, cost_model) >= cost
+
+@pytest.mark.parametrize("ordering", ["permutations", "held_karp", "heuristic"])
+def test_multi_goal_segments_chain_through_every_goal(ordering):
+    goals = GOALS[:4]
+    segments = PathFinder.astar_multi_goal_straight_preference(MAZE, START, goals, ordering=ordering, time_limit=None,
+                                                                cost_model=PathFinder.FlightTimeCost())
+
+    assert_visits_every_goal([START] + [segment[-1] for segment in segments], goals)
+    previous = START
+    for segment in segments:
+        assert_valid_path(MAZE, segment, previous, segment[-1])
+        previous = segment[-1]
+
+def rotation(bearing, order):
+    """Quarter turns to face each direction of order in turn, starting from bearing"""
+    quarters = 0
+    for direction in order:
+        quarters += PathFinder.rotation_quarters(bearing, direction)
+        bearing = direction
+    return quarters
+
+def test_rotation_quarters_follow_the_bearing_yaws():
+    for a in Utils.BEARINGS:
+        for b in Utils.BEARINGS:
+            turn = abs(Utils.bearing_yaw(a) - Utils.bearing_yaw(b))
+            assert PathFinder.rotation_quarters(a, b) == min(turn, 360 - turn) // 90
+
+@pytest.mark.parametrize("bearing", Utils.BEARINGS)
+def test_schedule_directions_turns_the_least(bearing):
+    for count in range(1, 5):
+        for directions in itertools.permutations(Utils.BEARINGS, count):
+            order = PathFinder.schedule_directions(bearing, list(directions))
+
+            assert sorted(order) == sorted(directions)
+            assert rotation(bearing, order) == min(rotation(bearing, permutation)
+                                                   for permutation in itertools.permutations(directions))
+
+def test_detection_schedule_turns_the_least_over_the_mission():
+    waypoints = GOALS[:4]
+    detections = {(7, 7): ["South", "North"], (2, 6): ["West"], (6, 1): ["East", "West", "North"],
+                  (4, 4): ["South", "East"]}
+
+    schedule = PathFinder.detection_schedule("North", waypoints, detections)
+
+    assert [sorted(order) for order in schedule] == [sorted(detections[waypoint]) for waypoint in waypoints]
+    every_schedule = itertools.product(*(itertools.permutations(detections[waypoint]) for waypoint in waypoints))
+    assert rotation("North", sum(schedule, [])) == min(rotation("North", sum(map(list, orders), []))
+                                                       for orders in every_schedule)
+
+@pytest.mark.parametrize("cost_model", COST_MODELS)
+def test_held_karp_orders_goals_by_flight_and_rotation(cost_model):
+    goals = GOALS[:5]
+    detections = {goal: [Utils.BEARINGS[i % 4], Utils.BEARINGS[(i + 2) % 4]] for i, goal in enumerate(goals)}
+    matrix = PathFinder.segment_matrix(MAZE, [START] + goals, cost_model=cost_model)
+    cheapest = cheapest_order_cost(matrix, goals, cost_model, detections, "East")
+
+    for ordering in (PathFinder.order_goals_held_karp, PathFinder.order_goals_permutations):
+        order = ordering(START, goals, matrix, cost_model, detections, "East")
+
+        assert_visits_every_goal(order, goals)
+        assert PathFinder.order_cost(matrix, order, cost_model, detections, "East") == cheapest
+
+@pytest.mark.parametrize("bearing", Utils.BEARINGS)
+def test_drone_turns_take_the_cost_model_turn_time(bearing):
+    api = SimulatedUserApi(MAZE, seed=0)
+    drone = Drone(api=api, sleep=api.sleep, clock=api.clock)
+    drone.take_off()
+    started = api.elapsed
+
+    drone.turn_to_bearing(bearing)
+
+    assert round(api.yaw) == Utils.bearing_yaw(bearing)
+    assert api.elapsed - started == pytest.approx(
+        Utils.rotation_time(PathFinder.rotation_quarters("North", bearing)))
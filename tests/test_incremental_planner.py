@@ -0,0 +1,83 @@
+import pytest
+
+import PathFinder
+import Utils
+from Drone import Drone, LAST_STEP_HEIGHT
+from Maze import Maze
+from Simulator import SimulatedUserApi
+from conftest import random_maze, assert_valid_path
+
+def copy_maze(maze):
+    return Maze(maze.width, maze.height, bytearray(maze.cells), maze.wall_count)
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_repaired_routes_stay_shortest(seed):
+    maze = random_maze(8, 8, seed, extra_openings=0.5)
+    start, goal = (0, 0), (7, 7)
+    planner = PathFinder.IncrementalPlanner(maze, start, goal)
+
+    while True:
+        path = planner.plan()
+        distance = PathFinder.distance_field(maze, goal).distance(start)
+        if path is None:
+            assert distance is None
+            break
+        assert_valid_path(maze, path, start, goal)
+        assert len(path) - 1 == distance
+
+        if len(path) > 2:
+            # Fly one cell along the route
+            start = path[1]
+            planner.update_start(start)
+            path = path[1:]
+        # A wall turns up across the next step
+        planner.add_wall(path[0], path[1])
+
+def race(truth, known, challenge=1, **api_options):
+    """Fly the fastest route on known over truth, returning (reached, api)"""
+    api = SimulatedUserApi(truth, seed=api_options.pop('seed', 0), **api_options)
+    drone = Drone(challenge=challenge, phase=2, api=api, sleep=api.sleep, clock=api.clock)
+    drone.take_off()
+    goal = (truth.width - 1, truth.height - 1)
+    path = PathFinder.astar_heading_state(known, (0, 0), goal, PathFinder.FlightTimeCost())
+    return PathFinder.fly_race_path(known, Utils.optimized_path(path), drone), api
+
+@pytest.mark.parametrize("api_options", [{'telemetry_offset': (-20, 0)}, {'telemetry_offset': (0, 20)},
+                                         {'noise': 8, 'seed': 4}, {'noise': 8, 'seed': 5}, {'noise': 12, 'seed': 6}])
+def test_race_on_a_correct_maze_ignores_telemetry_error(api_options):
+    for seed in range(5):
+        truth = random_maze(8, 8, seed, extra_openings=0.3)
+        known = copy_maze(truth)
+
+        reached, api = race(truth, known, **dict(api_options))
+
+        assert reached and api.cell == (7, 7)
+        assert bytes(known.cells) == bytes(truth.cells)
+        assert api.scans == 0 and api.collisions == 0
+
+@pytest.mark.parametrize("seed", [1, 2, 3, 5])
+def test_race_corrects_walls_missing_from_the_maze(seed):
+    truth = random_maze(8, 8, seed, extra_openings=0.2)
+    known = Maze(8, 8)
+    for index, (cell1, cell2) in enumerate(truth.walls):
+        if index % 3:
+            known.add_wall(cell1, cell2)
+
+    reached, api = race(truth, known, noise=3, seed=seed)
+
+    assert reached and api.cell == (7, 7)
+    assert api.z == LAST_STEP_HEIGHT
+    assert 0 < api.scans <= PathFinder.RACE_CORRECTION_ROUNDS
+    # Every wall found in flight is real
+    assert all(not truth.is_passable(cell1, cell2) for cell1, cell2 in known.walls)
+
+def test_race_to_a_walled_off_goal_gives_up():
+    truth = random_maze(8, 8, seed=3, extra_openings=0.3)
+    known = copy_maze(truth)
+    for neighbor in truth.get_neighbors((7, 7)):
+        truth.add_wall((7, 7), neighbor)
+
+    reached, api = race(truth, known)
+
+    assert not reached and api.cell != (7, 7)
+    assert api.scans <= PathFinder.RACE_CORRECTION_ROUNDS
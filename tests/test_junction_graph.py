@@ -0,0 +1,32 @@
+import itertools
+
+import pytest
+
+import PathFinder
+from JunctionGraph import JunctionGraph
+from Maze import Maze
+from conftest import random_maze, assert_valid_path
+
+COST_MODELS = [PathFinder.TURN_COUNT_COST, PathFinder.FlightTimeCost()]
+
+@pytest.mark.parametrize("cost_model", COST_MODELS)
+@pytest.mark.parametrize("seed, extra_openings", [(1, 0.0), (2, 0.2), (3, 0.6)])
+def test_graph_routes_cost_the_same_as_grid_routes(cost_model, seed, extra_openings):
+    maze = random_maze(9, 7, seed, extra_openings)
+    graph = JunctionGraph(maze)
+    cells = [(x, y) for y in range(maze.height) for x in range(maze.width)]
+
+    for start, goal in list(itertools.permutations(cells, 2))[::37]:
+        path = graph.astar(start, goal, cost_model)
+
+        assert_valid_path(maze, path, start, goal)
+        grid_path = PathFinder.astar_heading_state(maze, start, goal, cost_model)
+        assert cost_model.path_cost(path) == cost_model.path_cost(grid_path)
+
+def test_graph_route_without_a_path():
+    maze = Maze(4, 1)
+    maze.add_wall((1, 0), (2, 0))
+    graph = JunctionGraph(maze)
+
+    assert graph.astar((0, 0), (3, 0)) is None
+    assert graph.astar((2, 0), (2, 0)) == [(2, 0)]
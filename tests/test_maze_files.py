@@ -0,0 +1,80 @@
+import pytest
+
+import Utils
+from conftest import random_maze
+
+QUERY = {'planner': "astar", 'start': [0, 0], 'goal': [5, 5]}
+PLAN = [[0, 0], [0, 5], [5, 5]]
+
+def assert_same_maze(loaded, maze):
+    assert (loaded.width, loaded.height, loaded.wall_count) == (maze.width, maze.height, maze.wall_count)
+    assert bytes(loaded.cells) == bytes(maze.cells)
+
+@pytest.mark.parametrize("width, height", [(1, 1), (6, 6), (9, 4)])
+def test_binary_round_trip(tmp_path, width, height):
+    maze = random_maze(width, height, seed=width * height, extra_openings=0.2)
+    filename = str(tmp_path / ("maze" + Utils.BINARY_MAZE_EXTENSION))
+
+    Utils.save_maze_to_file(maze, filename, binary=True)
+
+    assert_same_maze(Utils.load_maze_from_file(filename), maze)
+    assert not (tmp_path / ("maze" + Utils.BINARY_MAZE_EXTENSION + ".tmp")).exists()
+
+def test_json_round_trip(tmp_path):
+    maze = random_maze(7, 5, seed=1)
+    filename = str(tmp_path / "maze.txt")
+
+    Utils.save_maze_to_file(maze, filename)
+
+    assert_same_maze(Utils.load_maze_from_file(filename), maze)
+
+def test_truncated_binary_maze_is_rejected(tmp_path):
+    filename = tmp_path / "maze.maze"
+    Utils.save_maze_to_file(random_maze(6, 6, seed=2), str(filename), binary=True)
+    filename.write_bytes(filename.read_bytes()[:-1])
+
+    with pytest.raises(ValueError):
+        Utils.load_maze_from_file(str(filename))
+
+def test_binary_maze_supersedes_json_maze(tmp_path):
+    discovered = random_maze(6, 6, seed=3)
+    binary_filename = str(tmp_path / "maze.maze")
+    json_filename = str(tmp_path / "maze.txt")
+    Utils.save_maze_to_file(random_maze(6, 6, seed=4), json_filename)
+
+    assert Utils.load_maze_from_files([binary_filename, json_filename]).cells != discovered.cells
+
+    Utils.save_maze_to_file(discovered, binary_filename, binary=True)
+
+    assert_same_maze(Utils.load_maze_from_files([binary_filename, json_filename]), discovered)
+    assert Utils.load_maze_from_files([str(tmp_path / "missing.maze")]) is None
+
+def test_cached_plan_round_trip(tmp_path):
+    maze = random_maze(6, 6, seed=5)
+    filename = str(tmp_path / "maze.maze")
+
+    Utils.save_cached_plan(filename, maze, QUERY, PLAN)
+
+    assert Utils.load_cached_plan(filename, maze, QUERY) == [(0, 0), (0, 5), (5, 5)]
+    assert Utils.load_cached_plan(filename, maze, dict(QUERY, goal=[4, 4])) is None
+
+def test_cached_plan_is_invalidated_by_a_changed_maze(tmp_path):
+    maze = random_maze(6, 6, seed=6)
+    filename = str(tmp_path / "maze.maze")
+    Utils.save_cached_plan(filename, maze, QUERY, PLAN)
+
+    changed = random_maze(6, 6, seed=6)
+    changed.add_wall((0, 0), (1, 0) if changed.is_passable((0, 0), (1, 0)) else (0, 1))
+
+    assert Utils.load_cached_plan(filename, changed, QUERY) is None
+
+def test_saving_a_maze_clears_its_plan_cache(tmp_path):
+    maze = random_maze(6, 6, seed=7)
+    filename = str(tmp_path / "maze.maze")
+    Utils.save_maze_to_file(maze, filename, binary=True)
+    Utils.save_cached_plan(filename, maze, QUERY, PLAN)
+
+    Utils.save_maze_to_file(maze, filename, binary=True)
+
+    assert not (tmp_path / "maze.plans.json").exists()
+    assert Utils.load_cached_plan(filename, maze, QUERY) is None